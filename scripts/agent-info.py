@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Agent Info
+Full description, examples and metadata of shortlisted agents, read from the
+details store generate-agent-list.py writes next to AGENT_DIRECTORY.md
+
+Usage:
+    python3 agent-info.py <name> [<name>...] [--dir=PATH] [--json]
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import agent_index
+
+
+def format_agent(info):
+    """Markdown block of one agent"""
+    badges = []
+    if info.get('consolidated'):
+        badges.append("🔧 Consolidated")
+    if info.get('optimized'):
+        badges.append("⚡ Optimized")
+    badge_str = f" *({', '.join(badges)})*" if badges else ""
+    # Descriptions store newlines as literal "\n" sequences
+    description = info.get('description', '').replace('\\n', '\n')
+    return f"### `{info['name']}`{badge_str}\n\n{description}\n"
+
+
+def main():
+    """Main entry point"""
+    names = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    options = dict(arg[2:].split('=', 1) for arg in sys.argv[1:] if arg.startswith('--') and '=' in arg)
+
+    if not names:
+        print(__doc__.strip())
+        sys.exit(1)
+
+    directory = Path(options['dir']) if 'dir' in options else agent_index.default_catalog_dir()
+    details = agent_index.load_details(directory, names)
+    missing = [name for name in names if name not in details]
+
+    if '--json' in sys.argv[1:]:
+        print(json.dumps({"agents": [details[name] for name in names if name in details], "missing": missing},
+                         indent=2, ensure_ascii=False))
+    else:
+        print('\n---\n\n'.join(format_agent(details[name]) for name in names if name in details))
+        for name in missing:
+            print(f"Unknown agent: {name} (not in {directory / agent_index.DETAILS_FILE})")
+    sys.exit(1 if missing else 0)
+
+
+if __name__ == "__main__":
+    main()
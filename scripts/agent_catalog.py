@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Agent Catalog Module - Structured agent catalog with a memory-mapped query index
+
+generate-agent-list.py writes two files next to AGENT_DIRECTORY.md:
+
+    agent-catalog.json  {"version": 1, "agents": [record, ...]}, one record per line
+    agent-catalog.idx   fixed-width rows (type flags, model, color, byte range of the
+                        record in the JSON) behind a string table of names, models and colors
+
+Queries filter the mapped rows by type, model and color and only decode the JSON
+records that pass; keyword filters then look at the decoded name, summary and
+example triggers. Nothing here reads the agent .md files.
+
+Usage:
+    python3 agent_catalog.py [--type=consolidated|optimized|juvenile|standard] [--model=NAME]
+                             [--color=NAME] [--keyword=WORDS] [--dir=PATH] [--names]
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from pathlib import Path
+
+import agent_index
+
+CATALOG_FILE = "agent-catalog.json"
+CATALOG_INDEX = "agent-catalog.idx"
+CATALOG_VERSION = 1
+
+INDEX_MAGIC = b"AGC1"
+# magic, version, rows, byte length of the JSON it indexes, byte length of the string table
+INDEX_HEADER = struct.Struct("<4sHIII")
+# flags, name, model and color string IDs, offset and length of the record in the JSON
+INDEX_ROW = struct.Struct("<BIIIII")
+
+CONSOLIDATED = 1
+OPTIMIZED = 2
+JUVENILE = 4
+TYPES = {"consolidated": CONSOLIDATED, "optimized": OPTIMIZED, "juvenile": JUVENILE}
+
+
+def type_flags(record):
+    """Bit flags of a record's types"""
+    return ((CONSOLIDATED if record["consolidated"] else 0) | (OPTIMIZED if record["optimized"] else 0)
+            | (JUVENILE if record["juvenile"] else 0))
+
+
+def catalog_record(agent, summary=""):
+    """Catalog record of one parsed agent (as extracted by generate-agent-list.py)"""
+    metadata = agent.get('metadata') or {}
+    if not isinstance(metadata, dict):
+        metadata = {}
+    description = agent.get('description', '')
+    # Descriptions store newlines as literal "\n" sequences
+    examples = agent_index.EXAMPLE_RE.findall(description.replace('\\n', '\n'))
+    triggers = [request.strip().strip('"') for example in examples
+                for request in agent_index.EXAMPLE_USER_RE.findall(example)]
+    return {
+        "name": agent['name'],
+        "file": agent.get('file', ''),
+        "consolidated": bool(agent.get('consolidated')),
+        "optimized": bool(agent.get('optimized')),
+        "juvenile": agent['name'].startswith('juvenile-'),
+        "model": str(metadata.get('model') or ''),
+        "color": str(metadata.get('color') or ''),
+        "description_sha256": hashlib.sha256(description.encode('utf-8')).hexdigest(),
+        "summary": summary,
+        "triggers": triggers
+    }
+
+
+def save_catalog(directory, records):
+    """Atomically write agent-catalog.json and its index"""
+    records = sorted(records, key=lambda r: r["name"])
+    head = f'{{"version": {CATALOG_VERSION}, "agents": [\n'.encode('utf-8')
+    body = []
+    ranges = []
+    position = len(head)
+    for i, record in enumerate(records):
+        line = json.dumps(record, ensure_ascii=False).encode('utf-8')
+        ranges.append((position, len(line)))
+        separator = b",\n" if i < len(records) - 1 else b"\n"
+        body.append(line + separator)
+        position += len(line) + len(separator)
+    document = head + b"".join(body) + b"]}\n"
+
+    strings = []
+    ids = {}
+
+    def string_id(value):
+        if value not in ids:
+            ids[value] = len(strings)
+            strings.append(value)
+        return ids[value]
+
+    rows = [INDEX_ROW.pack(type_flags(record), string_id(record["name"]), string_id(record["model"]),
+                           string_id(record["color"]), offset, length)
+            for record, (offset, length) in zip(records, ranges)]
+    table = json.dumps(strings, ensure_ascii=False).encode('utf-8')
+    index = INDEX_HEADER.pack(INDEX_MAGIC, CATALOG_VERSION, len(rows), len(document), len(table)) + table + b"".join(rows)
+
+    directory = Path(directory)
+    for name, data in ((CATALOG_FILE, document), (CATALOG_INDEX, index)):
+        tmp_path = directory / f"{name}.{os.getpid()}.tmp"
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, directory / name)
+
+
+class Catalog:
+    """Read-only view of a catalog directory
+
+    Falls back to decoding the whole JSON when the index is missing or was
+    written for another version of the JSON.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.strings = []
+        self.rows = None
+        self.records = None
+        with open(self.directory / CATALOG_FILE, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            with open(self.directory / CATALOG_INDEX, 'rb') as f:
+                index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            index = None
+        if index is not None and len(index) >= INDEX_HEADER.size:
+            magic, version, count, json_length, table_length = INDEX_HEADER.unpack_from(index)
+            if magic == INDEX_MAGIC and version == CATALOG_VERSION and json_length == len(self.data):
+                start = INDEX_HEADER.size + table_length
+                self.strings = json.loads(index[INDEX_HEADER.size:start])
+                self.rows = list(INDEX_ROW.iter_unpack(index[start:start + count * INDEX_ROW.size]))
+        if index is not None:
+            index.close()
+        if self.rows is None:
+            self.records = json.loads(self.data[:]).get("agents", [])
+
+    def __len__(self):
+        return len(self.rows) if self.rows is not None else len(self.records)
+
+    def close(self):
+        self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def record(self, row):
+        """Decode the JSON record of an index row"""
+        return json.loads(self.data[row[4]:row[4] + row[5]])
+
+    def names(self):
+        """All agent names, sorted"""
+        if self.rows is not None:
+            return [self.strings[row[1]] for row in self.rows]
+        return [record["name"] for record in self.records]
+
+    def get(self, name):
+        """The record of one agent, or None"""
+        for record in self.query(name=name):
+            return record
+        return None
+
+    def query(self, type=None, model=None, color=None, keyword=None, name=None):
+        """Records matching every given filter
+
+        type is consolidated, optimized, juvenile or standard (neither consolidated
+        nor optimized); keyword words must each appear as a whole word, in any
+        inflection, in the name, summary or example triggers.
+        """
+        if type is not None and type != "standard" and type not in TYPES:
+            raise ValueError(f"Unknown agent type: {type}")
+        terms = set(agent_index.tokenize(keyword or "", agent_index.ENGLISH_STOPWORDS))
+
+        if self.rows is not None:
+            ids = {value: i for i, value in enumerate(self.strings)}
+            if any(value is not None and value not in ids for value in (model, color, name)):
+                return []
+            candidates = (self.record(row) for row in self.rows if self.row_matches(row, type, ids, model, color, name))
+        else:
+            candidates = (record for record in self.records
+                          if (type is None or flags_match(type_flags(record), type))
+                          and (model is None or record["model"] == model)
+                          and (color is None or record["color"] == color)
+                          and (name is None or record["name"] == name))
+
+        results = []
+        for record in candidates:
+            if terms:
+                text = " ".join([record["name"].replace('-', ' '), record["summary"]] + record["triggers"])
+                if agent_index.match_terms(text, terms, agent_index.ENGLISH_STOPWORDS)[0] != terms:
+                    continue
+            results.append(record)
+        return results
+
+    def row_matches(self, row, type, ids, model, color, name):
+        """Whether an index row passes the type, model, color and name filters"""
+        return ((type is None or flags_match(row[0], type))
+                and (model is None or row[2] == ids[model])
+                and (color is None or row[3] == ids[color])
+                and (name is None or row[1] == ids[name]))
+
+
+def flags_match(flags, type):
+    """Whether type flags satisfy a type filter"""
+    if type == "standard":
+        return not flags & (CONSOLIDATED | OPTIMIZED)
+    return bool(flags & TYPES[type])
+
+
+def open_catalog(directory=None):
+    """Catalog of a directory (default: the session's, else ~/.claude/data); None when not generated"""
+    directory = Path(directory) if directory else agent_index.default_catalog_dir()
+    try:
+        return Catalog(directory)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def main(argv=None):
+    """Command line interface"""
+    argv = sys.argv[1:] if argv is None else argv
+    options = dict(arg[2:].split('=', 1) for arg in argv if arg.startswith('--') and '=' in arg)
+    catalog = open_catalog(options.get('dir'))
+    if catalog is None:
+        print(json.dumps({"status": "error", "message": f"No {CATALOG_FILE} (run generate-agent-list.py)"}))
+        return 1
+    with catalog:
+        try:
+            records = catalog.query(type=options.get('type'), model=options.get('model'),
+                                    color=options.get('color'), keyword=options.get('keyword'))
+        except ValueError as e:
+            print(json.dumps({"status": "error", "message": str(e)}))
+            return 1
+    if '--names' in argv:
+        print('\n'.join(record["name"] for record in records))
+    else:
+        print(json.dumps(records, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Agent Index Module - BM25 inverted index over agent names, descriptions and examples
+
+Built by generate-agent-list.py next to AGENT_DIRECTORY.md and queried by match-agent.py.
+The same directory holds agent-details.jsonl, the full descriptions read by agent-info.py.
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+from pathlib import Path
+
+INDEX_FILE = "agent-index.json"
+INDEX_VERSION = 3
+
+# The agent match-agent.py escalates to; it routes requests, so it is never a candidate itself
+LLM_MATCHER = "juvenile-agent-task-matcher"
+
+# Full agent descriptions: a header line of byte offsets, then one JSON line per agent
+DETAILS_FILE = "agent-details.jsonl"
+DETAILS_VERSION = 1
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Field boosts, applied by repeating a field's tokens
+NAME_BOOST = 3
+EXAMPLE_BOOST = 2
+
+TOKEN_RE = re.compile(r'[a-z0-9]+|[\u3400-\u9fff\uf900-\ufaff]+')
+CJK_RE = re.compile(r'[\u3400-\u9fff\uf900-\ufaff]')
+EXAMPLE_RE = re.compile(r'<example>(.*?)</example>', re.DOTALL)
+EXAMPLE_USER_RE = re.compile(r'^\s*user:\s*(.+)$', re.MULTILINE)
+AGENT_WORD_RE = re.compile(r'\bagents?\b', re.IGNORECASE)
+
+# Common English words
+ENGLISH_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "i", "in", "is",
+    "it", "its", "me", "my", "need", "needs", "of", "on", "or", "our", "so", "that", "the", "this",
+    "to", "we", "when", "with", "you", "your", "will", "can", "let", "ll", "s",
+}
+# ...plus the boilerplate every agent description repeats
+STOPWORDS = ENGLISH_STOPWORDS | {
+    "agent", "use", "using", "user", "assistant", "example", "examples", "context", "commentary",
+}
+
+
+def stem(token):
+    """Strip common English inflections so "tests", "testing" and "test" meet"""
+    if token.endswith('sses'):
+        token = token[:-2]
+    elif token.endswith('ies') and len(token) > 4:
+        token = token[:-2]
+    elif token.endswith('s') and not token.endswith('ss') and len(token) > 3:
+        token = token[:-1]
+    if token.endswith('ing') and len(token) > 5:
+        token = token[:-3]
+    elif token.endswith('ed') and len(token) > 4:
+        token = token[:-2]
+    if token.endswith('e') and len(token) > 4:
+        token = token[:-1]
+    return token
+
+
+def tokenize(text, stopwords=STOPWORDS):
+    """Lowercase, stemmed word tokens; CJK runs become unigrams plus bigrams"""
+    tokens = []
+    for token in TOKEN_RE.findall(text.lower()):
+        if CJK_RE.match(token):
+            tokens.extend(token)
+            tokens.extend(token[i:i + 2] for i in range(len(token) - 1))
+        elif token not in stopwords and len(token) > 1:
+            tokens.append(stem(token))
+    return tokens
+
+
+def match_terms(text, terms, stopwords=STOPWORDS):
+    """(query terms found in text, offset of the first matching word or -1)
+
+    terms are tokens from tokenize(); words of text are tokenized the same way
+    and compared whole, so "tests" meets "testing" but "data" never matches
+    "database".
+    """
+    matched = set()
+    first = -1
+    for found in TOKEN_RE.finditer(text.lower()):
+        hits = terms.intersection(tokenize(found.group(), stopwords))
+        if hits:
+            matched |= hits
+            if first < 0:
+                first = found.start()
+    return matched, first
+
+
+def agent_terms(agent):
+    """Term frequencies of one agent's name, description and example user requests"""
+    # Descriptions store newlines as literal "\n" sequences
+    description = agent.get('description', '').replace('\\n', '\n')
+    examples = EXAMPLE_RE.findall(description)
+    prose = EXAMPLE_RE.sub(' ', description)
+
+    tokens = tokenize(agent['name'].replace('-', ' ')) * NAME_BOOST
+    tokens += tokenize(prose)
+    vocabulary = set(tokens)
+    for example in examples:
+        for request in EXAMPLE_USER_RE.findall(example):
+            request_tokens = tokenize(request)
+            if AGENT_WORD_RE.search(request):
+                # "Create an agent that can migrate database schemas" describes the agent
+                # being built or tuned, so only words of this agent's own description count
+                request_tokens = [token for token in request_tokens if token in vocabulary]
+            tokens += request_tokens * EXAMPLE_BOOST
+
+    terms = {}
+    for token in tokens:
+        terms[token] = terms.get(token, 0) + 1
+    return terms
+
+
+def agent_hash(agent):
+    """Hash of the fields the index is built from"""
+    return hashlib.sha256(f"{agent['name']}\0{agent.get('description', '')}".encode('utf-8')).hexdigest()
+
+
+def build_index(agents, previous=None):
+    """Build the index, reusing term counts of agents unchanged since `previous`
+
+    Returns (index, rebuilt) where rebuilt is the number of agents re-tokenized.
+    """
+    old_docs = previous.get('docs', {}) if previous else {}
+    docs = {}
+    rebuilt = 0
+    for agent in agents:
+        if agent['name'] == LLM_MATCHER:
+            continue
+        digest = agent_hash(agent)
+        old = old_docs.get(agent['name'])
+        if old and old['hash'] == digest:
+            docs[agent['name']] = old
+            continue
+        terms = agent_terms(agent)
+        docs[agent['name']] = {"hash": digest, "length": sum(terms.values()), "terms": terms}
+        rebuilt += 1
+
+    postings = {}
+    for name, doc in docs.items():
+        for term, count in doc['terms'].items():
+            postings.setdefault(term, []).append([name, count])
+
+    total_length = sum(doc['length'] for doc in docs.values())
+    index = {
+        "version": INDEX_VERSION,
+        "doc_count": len(docs),
+        "avg_length": total_length / len(docs) if docs else 0,
+        "docs": docs,
+        "postings": postings
+    }
+    return index, rebuilt
+
+
+def default_catalog_dir():
+    """Current ASM session directory when it has an index, otherwise ~/.claude/data"""
+    session_file = Path.cwd() / '.asm' / '.current_asm_session'
+    if session_file.exists():
+        session_path = Path(session_file.read_text().strip())
+        if index_path(session_path).exists():
+            return session_path
+    return Path.home() / ".claude" / "data"
+
+
+def index_path(directory):
+    """Location of the index inside a catalog directory"""
+    return Path(directory) / INDEX_FILE
+
+
+def load_index(directory):
+    """Load a persisted index, or None when missing or from another version"""
+    try:
+        with open(index_path(directory), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    return index if index.get('version') == INDEX_VERSION else None
+
+
+def save_index(directory, index):
+    """Atomically write the index"""
+    path = index_path(directory)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def save_details(directory, agents):
+    """Atomically write the keyed store of full agent descriptions
+
+    The header line maps each name to the [offset, length] of its line,
+    counted from the end of the header, so a lookup reads only that line.
+    """
+    lines = {}
+    for agent in sorted(agents, key=lambda a: a['name']):
+        # default=str keeps YAML dates and other non-JSON scalars serializable
+        lines[agent['name']] = (json.dumps(agent, ensure_ascii=False, default=str) + "\n").encode('utf-8')
+    offsets = {}
+    position = 0
+    for name, line in lines.items():
+        offsets[name] = [position, len(line)]
+        position += len(line)
+    header = json.dumps({"version": DETAILS_VERSION, "offsets": offsets}, ensure_ascii=False, separators=(',', ':'))
+    path = Path(directory) / DETAILS_FILE
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(header.encode('utf-8') + b"\n")
+        f.writelines(lines.values())
+    os.replace(tmp_path, path)
+
+
+def load_details(directory, names):
+    """Full info of the named agents from the details store; unknown names are left out"""
+    details = {}
+    try:
+        f = open(Path(directory) / DETAILS_FILE, 'rb')
+    except FileNotFoundError:
+        return details
+    with f:
+        try:
+            header = json.loads(f.readline())
+        except ValueError:
+            return details
+        if header.get('version') != DETAILS_VERSION:
+            return details
+        base = f.tell()
+        for name in names:
+            if name not in header['offsets']:
+                continue
+            offset, length = header['offsets'][name]
+            f.seek(base + offset)
+            details[name] = json.loads(f.read(length))
+    return details
+
+
+def update_index(directory, agents):
+    """Incrementally rebuild and persist the index of a catalog directory"""
+    index, rebuilt = build_index(agents, load_index(directory))
+    save_index(directory, index)
+    return index, rebuilt
+
+
+def search(index, query, limit=5):
+    """Rank agents against a free-text query with BM25; returns [(name, score)]"""
+    doc_count = index['doc_count']
+    avg_length = index['avg_length'] or 1
+    docs = index['docs']
+    scores = {}
+    for term in set(tokenize(query)):
+        postings = index['postings'].get(term)
+        if not postings:
+            continue
+        idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+        for name, count in postings:
+            norm = K1 * (1 - B + B * docs[name]['length'] / avg_length)
+            scores[name] = scores.get(name, 0.0) + idf * count * (K1 + 1) / (count + norm)
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+    return ranked[:limit]
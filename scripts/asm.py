@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+ASM Command - Entry point for ASM maintenance commands
+
+Usage:
+    python3 asm.py <command> [args...]
+
+Commands:
+    compact [session_path]    Seal state.jsonl into a compact, dictionary-encoded segment
+    stats [session_path] [--command=NAME]
+                              p50/p95/p99 per command and phase from trace.jsonl (recorded with ASM_TRACE=1)
+    search <query> [--limit=N] [--session=NAME] [--no-refresh]
+                              Ranked snippets from every dialogue.md under .asm/
+    replay [states|messages] [--since=ISO] [--until=ISO] [--state=NAME] [--trigger=TEXT]
+           [--conversation=ID] [--lane=ID] [--format=jsonl|csv|columns] [--output=PATH]
+                              Stream the session history through seekable block indexes
+    archive [sweep|list|cat|restore] [conv_id] [member] [--older-than=DAYS] [--codec=zstd|gzip|xz] [--dry-run]
+                              Pack old conversations into per-file compressed archives, or read them back
+    run <scenario> [args...]  Execute the commands of an asm_todo scenario in one call and print one combined
+                              JSON result: init <project>, start_conversation, transition_to_agent <agent> [trigger]
+                              [--lane=ID|new], end_conversation <summary>, end_session
+    check write|exec [item...] [--stdin] [--state=NAME] [--lane=ID]
+                              Check file writes or commands against the current (or given) state's
+                              permissions; --stdin reads one item per line. Exits 1 when any is denied
+"""
+
+import sys
+from pathlib import Path
+
+from asm_core import get_session_path, output_json
+
+
+def cmd_compact(args):
+    """Seal the session's state log into a compact segment"""
+    from asm_store import compact_session
+    session_path = args[0] if args else get_session_path()
+    if not session_path:
+        output_json({"status": "error", "message": "No active session"})
+        return 1
+    try:
+        output_json(compact_session(session_path))
+    except ValueError as e:
+        output_json({"status": "error", "message": str(e)})
+        return 1
+    return 0
+
+
+def cmd_stats(args):
+    """Summarize the session's command traces"""
+    from asm_trace import TRACE_FILE, stats
+    options = dict(arg[2:].split('=', 1) for arg in args if arg.startswith('--') and '=' in arg)
+    paths = [arg for arg in args if not arg.startswith('--')]
+    session_path = paths[0] if paths else get_session_path()
+    if not session_path:
+        output_json({"status": "error", "message": "No active session"})
+        return 1
+    report = stats(session_path, options.get('command'))
+    if not report:
+        output_json({"status": "error", "message": f"No traces in {Path(session_path) / TRACE_FILE} (set ASM_TRACE=1 to record them)"})
+        return 1
+    output_json(report)
+    return 0
+
+
+def cmd_search(args):
+    """Search the dialogues of every session in this directory"""
+    from asm_search import main as search_main
+    return search_main(args)
+
+
+def cmd_replay(args):
+    """Stream a filtered export of the session history"""
+    from asm_replay import main as replay_main
+    return replay_main(args)
+
+
+def cmd_archive(args):
+    """Archive old conversations of the session or read archived ones"""
+    from asm_archive import main as archive_main
+    return archive_main(args)
+
+
+def cmd_run(args):
+    """Execute a scenario's deterministic steps in one process"""
+    from asm_core import dispatch
+    result = dispatch("run", args)["result"]
+    return 1 if result.get("status") == "error" else 0
+
+
+def cmd_check(args):
+    """Batch-check file writes or commands against a state's permission profile"""
+    from asm_core import dispatch
+    items = [arg for arg in args if arg != '--stdin']
+    if '--stdin' in args:
+        items.extend(line.rstrip('\n') for line in sys.stdin if line.strip())
+    result = dispatch("check", items)["result"]
+    return 1 if result.get("status") == "error" or result.get("denied") else 0
+
+
+COMMANDS = {
+    "compact": cmd_compact,
+    "stats": cmd_stats,
+    "search": cmd_search,
+    "replay": cmd_replay,
+    "archive": cmd_archive,
+    "run": cmd_run,
+    "check": cmd_check,
+}
+
+
+def main():
+    """Main entry point"""
+    if len(sys.argv) < 2 or sys.argv[1] not in COMMANDS:
+        print(__doc__.strip())
+        sys.exit(1)
+    sys.exit(COMMANDS[sys.argv[1]](sys.argv[2:]))
+
+
+if __name__ == "__main__":
+    main()
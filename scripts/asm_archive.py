@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+ASM Archive Module - Compressed archival of ended conversations
+
+A conversation older than the threshold is packed into
+<session>/archive/conv_NNN.asmz and its directory is removed. Every file is
+compressed on its own (zstd when the zstandard package is installed, else
+gzip, or xz on request), so reading one file decompresses only that member:
+
+    ASMZ <member blobs...> <JSON member index> <index length: u64> ASMZ
+
+The member index is also appended to archive/index.jsonl as an
+{"type": "archive", ...} record (restores add {"type": "restore", ...}); the
+conversation stream in messages.jsonl / session.db only holds conversations. read_file() resolves a path under
+conversations/conv_NNN/ from the directory or, once archived, from the archive.
+
+asm_end_conversation.py sweeps at most once a day; `asm.py archive` sweeps on demand.
+
+Usage:
+    python3 asm_archive.py [sweep] [--older-than=DAYS] [--codec=zstd|gzip|xz] [--dry-run] [--session=PATH]
+    python3 asm_archive.py cat <conv_id> <member> [--session=PATH]
+    python3 asm_archive.py list <conv_id> [--session=PATH]
+    python3 asm_archive.py restore <conv_id> [--session=PATH]
+"""
+
+import json
+import os
+import shutil
+import struct
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from asm_store import current_session_path, session_lock
+
+ARCHIVE_DIR = 'archive'
+ARCHIVE_SUFFIX = '.asmz'
+# Log of archive and restore records, one JSON line each
+ARCHIVE_INDEX = 'index.jsonl'
+ARCHIVE_MAGIC = b'ASMZ'
+ARCHIVE_VERSION = 1
+# Index length and closing magic at the end of every archive
+ARCHIVE_TRAILER = struct.Struct('<Q4s')
+
+# Days since a conversation's last write before it is archived
+ARCHIVE_AFTER_DAYS = float(os.environ.get('ASM_ARCHIVE_AFTER', 30))
+# Marker whose mtime records the last sweep; end_conversation sweeps at most this often
+SWEEP_STAMP = '.last_sweep'
+SWEEP_INTERVAL = 24 * 3600
+CHUNK_SIZE = 1024 * 1024
+
+
+def available_codecs():
+    """Codec names usable here, preferred first"""
+    from importlib.util import find_spec
+    # zstandard is optional
+    return (['zstd'] if find_spec('zstandard') else []) + ['gzip', 'xz']
+
+
+def compressor(codec):
+    """New streaming compressor (compress(chunk) / flush()) for one member"""
+    if codec == 'zstd':
+        import zstandard
+        return zstandard.ZstdCompressor(level=10).compressobj()
+    if codec == 'xz':
+        import lzma
+        return lzma.LZMACompressor()
+    if codec == 'gzip':
+        import zlib
+        # wbits=31 writes a gzip stream that gzip.decompress reads back
+        return zlib.compressobj(6, zlib.DEFLATED, 31)
+    raise ValueError(f"Unknown codec: {codec}")
+
+
+def decompressor(codec):
+    """Function decompressing one member's bytes"""
+    if codec == 'zstd':
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress
+    if codec == 'xz':
+        import lzma
+        return lzma.decompress
+    if codec == 'gzip':
+        import gzip
+        return gzip.decompress
+    raise ValueError(f"Unknown codec: {codec}")
+
+
+def archive_path(session_path, conv_id):
+    """Location of a conversation's archive"""
+    return Path(session_path) / ARCHIVE_DIR / f"{conv_id}{ARCHIVE_SUFFIX}"
+
+
+def conversation_files(conv_path):
+    """Yield (relative_path, path, stat) for every file of a conversation directory"""
+    stack = [Path(conv_path)]
+    while stack:
+        directory = stack.pop()
+        with os.scandir(directory) as entries:
+            for entry in sorted(entries, key=lambda e: e.name):
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(Path(entry.path))
+                elif entry.is_file(follow_symlinks=False):
+                    yield os.path.relpath(entry.path, conv_path), entry.path, entry.stat(follow_symlinks=False)
+
+
+def pack(conv_path, target, codec):
+    """Write the archive of a conversation directory; returns its member index"""
+    compressor(codec)  # fail on an unknown codec before writing anything
+    members = {}
+    tmp_target = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_target, 'wb') as out:
+            out.write(ARCHIVE_MAGIC)
+            for rel_path, path, st in conversation_files(conv_path):
+                offset = out.tell()
+                stream = compressor(codec)
+                with open(path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                        out.write(stream.compress(chunk))
+                out.write(stream.flush())
+                members[rel_path] = {"offset": offset, "length": out.tell() - offset, "size": st.st_size,
+                                     "mtime_ns": st.st_mtime_ns, "mode": st.st_mode & 0o7777}
+            index = json.dumps({"version": ARCHIVE_VERSION, "codec": codec, "members": members},
+                               ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            out.write(index)
+            out.write(ARCHIVE_TRAILER.pack(len(index), ARCHIVE_MAGIC))
+            out.flush()
+            os.fsync(out.fileno())
+    except BaseException:
+        # An unreadable or vanished member abandons the archive; leave no partial file behind
+        tmp_target.unlink(missing_ok=True)
+        raise
+    os.replace(tmp_target, target)
+    return members
+
+
+class ArchiveReader:
+    """Random access to the members of one archive"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.file = open(self.path, 'rb')
+        try:
+            self.file.seek(-ARCHIVE_TRAILER.size, os.SEEK_END)
+            index_length, magic = ARCHIVE_TRAILER.unpack(self.file.read(ARCHIVE_TRAILER.size))
+            if magic != ARCHIVE_MAGIC:
+                raise ValueError(f"Not an ASM archive: {self.path}")
+            self.file.seek(-ARCHIVE_TRAILER.size - index_length, os.SEEK_END)
+            index = json.loads(self.file.read(index_length))
+        except (OSError, ValueError):
+            self.file.close()
+            raise
+        self.codec = index["codec"]
+        self.members = index["members"]
+        self._decompress = decompressor(self.codec)
+
+    def read(self, member):
+        """Decompressed bytes of one member"""
+        info = self.members.get(str(member))
+        if info is None:
+            raise FileNotFoundError(f"{member} is not in {self.path}")
+        self.file.seek(info["offset"])
+        return self._decompress(self.file.read(info["length"]))
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def locate(path):
+    """(archive, member) of a path under <session>/conversations/conv_NNN/, or None"""
+    path = Path(path).absolute()
+    for parent in path.parents:
+        if parent.parent.name == 'conversations' and parent.name.startswith('conv_'):
+            return archive_path(parent.parent.parent, parent.name), path.relative_to(parent).as_posix()
+    return None
+
+
+def read_file(path):
+    """Bytes of a conversation file, from disk or from its conversation's archive"""
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        located = locate(path)
+        if located is None or not located[0].exists():
+            raise
+        with ArchiveReader(located[0]) as reader:
+            return reader.read(located[1])
+
+
+def last_write(conv_path):
+    """Newest mtime among a conversation directory and its dialogue"""
+    times = [conv_path.stat().st_mtime]
+    try:
+        times.append((conv_path / 'dialogue.md').stat().st_mtime)
+    except FileNotFoundError:
+        pass
+    return max(times)
+
+
+def pinned_conversations(session_path):
+    """Conversations that must stay unpacked: the active one and those with open lanes"""
+    conv_dir = Path(session_path) / 'conversations'
+    pinned = set()
+    try:
+        pinned.add((conv_dir / '.current_conversation').read_text(encoding='utf-8').strip())
+    except FileNotFoundError:
+        pass
+    try:
+        lanes = json.loads((Path(session_path) / 'state.lanes.json').read_text(encoding='utf-8'))
+        pinned.update(info.get("conversation") for info in lanes.get("lanes", {}).values())
+    except (FileNotFoundError, ValueError):
+        pass
+    return pinned
+
+
+def append_index(session_path, record):
+    """Append a record to the session's archive/index.jsonl"""
+    line = json.dumps(record, ensure_ascii=False) + "\n"
+    # A single O_APPEND write keeps concurrent records from interleaving
+    fd = os.open(Path(session_path) / ARCHIVE_DIR / ARCHIVE_INDEX, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line.encode('utf-8'))
+    finally:
+        os.close(fd)
+
+
+def archive_conversation(session_path, conv_id, codec=None):
+    """Pack one conversation, record its member index in archive/index.jsonl and remove its directory
+
+    Packing runs unlocked; the swap from directory to archive happens under the
+    session lock and is abandoned (returning None) if the conversation became
+    active or gained a lane meanwhile.
+    """
+    codec = codec or available_codecs()[0]
+    conv_path = Path(session_path) / 'conversations' / conv_id
+    target = archive_path(session_path, conv_id)
+    target.parent.mkdir(exist_ok=True)
+    members = pack(conv_path, target, codec)
+    original = sum(info["size"] for info in members.values())
+    record = {
+        "type": "archive",
+        "conversation_id": conv_id,
+        "timestamp": datetime.now().isoformat(),
+        "archive": str(target),
+        "codec": codec,
+        "original_bytes": original,
+        "archive_bytes": target.stat().st_size,
+        "members": members
+    }
+    with session_lock(session_path):
+        if conv_id in pinned_conversations(session_path):
+            target.unlink()
+            return None
+        append_index(session_path, record)
+        shutil.rmtree(conv_path)
+    return {key: record[key] for key in ("conversation_id", "archive", "codec", "original_bytes", "archive_bytes")}
+
+
+def conversation_order(conv_id):
+    """Sort key of a conversation ID: its number, whatever its zero padding"""
+    number = conv_id.partition('_')[2]
+    return int(number) if number.isdigit() else 0
+
+
+def sweep(session_path, older_than_days=ARCHIVE_AFTER_DAYS, codec=None, dry_run=False):
+    """Archive every unpinned conversation not written to for older_than_days"""
+    conv_dir = Path(session_path) / 'conversations'
+    cutoff = time.time() - older_than_days * 86400
+    pinned = pinned_conversations(session_path)
+    due = []
+    try:
+        entries = [entry for entry in os.scandir(conv_dir)
+                   if entry.name.startswith('conv_') and entry.is_dir(follow_symlinks=False)]
+    except FileNotFoundError:
+        entries = []
+    for entry in entries:
+        try:
+            if entry.name not in pinned and last_write(Path(entry.path)) < cutoff:
+                due.append(entry.name)
+        except FileNotFoundError:
+            continue
+    due.sort(key=conversation_order)
+
+    # One conversation that cannot be packed must not stop the sweep of the others
+    archived = []
+    failed = []
+    if not dry_run:
+        for conv_id in due:
+            try:
+                result = archive_conversation(session_path, conv_id, codec)
+            except (OSError, ValueError) as e:
+                failed.append({"conversation_id": conv_id, "message": str(e)})
+                continue
+            if result is not None:
+                archived.append(result)
+    stamp = Path(session_path) / ARCHIVE_DIR / SWEEP_STAMP
+    if not dry_run:
+        stamp.parent.mkdir(exist_ok=True)
+        stamp.touch()
+    return {
+        "status": "dry_run" if dry_run else "archived",
+        "older_than_days": older_than_days,
+        "due": due if dry_run else [item["conversation_id"] for item in archived],
+        "archived": archived,
+        "failed": failed,
+        "original_bytes": sum(item["original_bytes"] for item in archived),
+        "archive_bytes": sum(item["archive_bytes"] for item in archived)
+    }
+
+
+def sweep_due(session_path):
+    """Whether the periodic sweep run by end_conversation is due"""
+    try:
+        last = (Path(session_path) / ARCHIVE_DIR / SWEEP_STAMP).stat().st_mtime
+    except FileNotFoundError:
+        return True
+    return time.time() - last >= SWEEP_INTERVAL
+
+
+def restore(session_path, conv_id):
+    """Unpack an archived conversation back into its directory
+
+    Runs under the session lock and never overwrites an existing conversation
+    directory; members are unpacked next to it and renamed into place.
+    """
+    target = archive_path(session_path, conv_id)
+    conv_path = Path(session_path) / 'conversations' / conv_id
+    with session_lock(session_path):
+        if conv_path.exists():
+            raise FileExistsError(f"Conversation directory already exists: {conv_path}")
+        tmp_path = conv_path.with_name(f".{conv_id}.{os.getpid()}.restore")
+        try:
+            with ArchiveReader(target) as reader:
+                for member, info in reader.members.items():
+                    path = tmp_path / member
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    path.write_bytes(reader.read(member))
+                    os.chmod(path, info["mode"])
+                    os.utime(path, ns=(info["mtime_ns"], info["mtime_ns"]))
+                restored = len(reader.members)
+            tmp_path.mkdir(parents=True, exist_ok=True)  # an archive of an empty directory
+            os.rename(tmp_path, conv_path)
+        except BaseException:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+        target.unlink()
+        append_index(session_path, {"type": "restore", "conversation_id": conv_id,
+                                    "timestamp": datetime.now().isoformat()})
+    return {"status": "restored", "conversation_id": conv_id, "files": restored, "path": str(conv_path)}
+
+
+def main(argv=None):
+    """Command line interface"""
+    argv = sys.argv[1:] if argv is None else argv
+    args = [arg for arg in argv if not arg.startswith('--')]
+    options = dict(arg[2:].split('=', 1) for arg in argv if arg.startswith('--') and '=' in arg)
+    action = args[0] if args else 'sweep'
+    session_path = options.get('session') or current_session_path()
+    if not session_path:
+        print(json.dumps({"status": "error", "message": "No active session"}, indent=2))
+        return 1
+
+    try:
+        if action == 'sweep':
+            result = sweep(session_path, float(options.get('older-than', ARCHIVE_AFTER_DAYS)),
+                           options.get('codec'), dry_run='--dry-run' in argv)
+        elif action == 'cat' and len(args) == 3:
+            sys.stdout.buffer.write(read_file(Path(session_path) / 'conversations' / args[1] / args[2]))
+            return 0
+        elif action == 'list' and len(args) == 2:
+            with ArchiveReader(archive_path(session_path, args[1])) as reader:
+                result = {"conversation_id": args[1], "codec": reader.codec,
+                          "members": {name: info["size"] for name, info in reader.members.items()}}
+        elif action == 'restore' and len(args) == 2:
+            result = restore(session_path, args[1])
+        else:
+            print(__doc__.strip())
+            return 1
+    except (OSError, ValueError) as e:
+        print(json.dumps({"status": "error", "message": str(e)}, indent=2, ensure_ascii=False))
+        return 1
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
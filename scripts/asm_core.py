@@ -0,0 +1,819 @@
+#!/usr/bin/env python3
+"""
+ASM Core Module - Shared state machine operations used by the asm_* scripts and the ASM daemon
+"""
+
+import fcntl
+import json
+import os
+import sys
+from pathlib import Path
+from datetime import datetime
+
+# asm_manifest, asm_search and socket are imported where they are used: every
+# hook invocation is a cold start and most commands never touch them
+import asm_trace
+from asm_trace import span
+from asm_store import BACKENDS, entry_conversation_id, open_store, session_lock, write_atomic
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+# Define permissions for different states
+MAIN_PERMISSIONS = {
+    "can_write": ["*.md", "*.txt", "*.log", "*.json", "*.csv", "non-executable files"],
+    "cannot_write": ["*.py", "*.js", "*.ts", "*.sh", "*.go", "*.rs", "*.c", "*.cpp", "*.java", "package.json", "requirements.txt", "Dockerfile", "Makefile", "any executable file"],
+    "can_execute": ["read", "list", "search", "analyze", "information-gathering functions only"],
+    "cannot_execute": ["run", "exec", "eval", "compile", "build"]
+}
+
+AGENT_PERMISSIONS = {
+    "can_write": ["*"],
+    "can_execute": ["*"]
+}
+
+BASH_PERMISSIONS = {
+    "can_write": ["*"],
+    "can_execute": ["*"]
+}
+
+# Initialization carries a note describing the phase
+INIT_PERMISSIONS = {
+    "can_write": ["*"],
+    "can_execute": ["*"],
+    "note": "System initialization phase"
+}
+
+# Zero padding of conversation IDs, wide enough that IDs sort in creation order
+CONV_ID_WIDTH = 6
+
+# Per-conversation file recording where its slice of the state log starts
+STATE_MARK_FILE = '.state_start'
+
+# Current state of every lane, kept beside the state log (see load_lanes)
+LANES_FILE = 'state.lanes.json'
+MAIN_LANE = 'main'
+LANE_ID_WIDTH = 3
+
+# Unix socket the optional ASM daemon listens on
+DAEMON_SOCKET = Path(os.environ.get("ASM_DAEMON_SOCKET", Path.home() / '.claude' / 'asm-daemon.sock'))
+
+
+def output_json(data, prefix_info=""):
+    """Simple JSON output"""
+    if prefix_info:
+        print(prefix_info)
+    print(json.dumps(data, indent=2, ensure_ascii=False))
+
+
+def error(message):
+    """Build an error response"""
+    return {"result": {"status": "error", "message": message}}
+
+
+def get_session_path(cwd=None):
+    """Get current session path from .asm directory in the given (or current) working directory"""
+    cwd = Path(cwd) if cwd else Path.cwd()
+    session_file = cwd / '.asm' / '.current_asm_session'
+    if session_file.exists():
+        return session_file.read_text().strip()
+    return None
+
+
+def conversation_number(conv_dir):
+    """Numeric part of a conv_* directory name (0 when it has none)"""
+    try:
+        return int(Path(conv_dir).name.split('_', 1)[1])
+    except (IndexError, ValueError):
+        return 0
+
+
+def allocate_conversation(session_path):
+    """Allocate the next conversation ID and make it the active conversation
+
+    The last allocated number lives in conversations/.conv_counter and is bumped
+    under an exclusive fcntl lock, so concurrent callers never share an ID and
+    allocation never lists the directory (except once, to seed the counter of a
+    session created before the counter existed). Seeded sessions keep the zero
+    padding of their existing conv_* names, recorded after the number, so their
+    IDs keep sorting in creation order.
+    """
+    conv_dir = Path(session_path) / 'conversations'
+    conv_dir.mkdir(parents=True, exist_ok=True)
+    fd = os.open(conv_dir / '.conv_counter', os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        current = os.read(fd, 64).decode('ascii').split()
+        if current:
+            last_num = int(current[0])
+            width = int(current[1]) if len(current) > 1 else CONV_ID_WIDTH
+        else:
+            existing = [p.name.split('_', 1)[1] for p in conv_dir.glob('conv_*') if conversation_number(p)]
+            last_num = max((int(number) for number in existing), default=0)
+            width = max((len(number) for number in existing), default=CONV_ID_WIDTH)
+        next_num = last_num + 1
+        os.lseek(fd, 0, os.SEEK_SET)
+        os.ftruncate(fd, 0)
+        os.write(fd, (f"{next_num}\n" if width == CONV_ID_WIDTH else f"{next_num} {width}\n").encode('ascii'))
+
+        conv_id = f"conv_{next_num:0{width}d}"
+        os.makedirs(conv_dir / conv_id / 'outputs', exist_ok=True)
+        write_atomic(conv_dir / '.current_conversation', conv_id)
+    finally:
+        os.close(fd)  # releases the lock
+    return conv_id
+
+
+def conversation_start(conv_path, store):
+    """Position in the store where a conversation's state entries begin (0 if unknown)"""
+    try:
+        mark = json.loads((Path(conv_path) / STATE_MARK_FILE).read_text(encoding='utf-8'))
+    except (FileNotFoundError, ValueError):
+        return 0
+    # Positions are backend and generation specific; after a migration or a
+    # compaction scan from the start
+    if mark.get("backend") != store.backend or mark.get("generation", 0) != store.generation():
+        return 0
+    return mark.get("position", 0)
+
+
+def agent_activity(entries, conv_id, end_time):
+    """Per-agent transition counts and seconds spent, from a conversation's state entries
+
+    Time in an agent runs from the transition into it until the next transition
+    of the same lane (or end_time when it never returned), so agents running in
+    parallel lanes are each credited with their own time.
+    """
+    activity = {}
+    current = {}
+    for entry in entries:
+        if entry.get("type") != "transition":
+            continue
+        owner = entry_conversation_id(entry)
+        if owner and owner != conv_id:
+            continue
+        timestamp = datetime.fromisoformat(entry["timestamp"])
+        data = entry.get("data", {})
+        lane = data.get("lane", MAIN_LANE)
+        if lane in current:
+            agent, since = current.pop(lane)
+            activity[agent]["seconds"] += (timestamp - since).total_seconds()
+        state = data.get("state")
+        if state and state not in ["MAIN", "BASH"]:
+            stats = activity.setdefault(state, {"agent": state, "count": 0, "seconds": 0.0})
+            stats["count"] += 1
+            current[lane] = (state, timestamp)
+    for agent, since in current.values():
+        activity[agent]["seconds"] += (end_time - since).total_seconds()
+    for stats in activity.values():
+        stats["seconds"] = round(stats["seconds"], 3)
+    return list(activity.values())
+
+
+def lane_history(entries, conv_id):
+    """Merge the lane sub-histories of a conversation into one summary per lane
+
+    Returns [{"lane", "agents", "transitions", "state"}] in the order lanes were opened.
+    """
+    lanes = {}
+    for entry in entries:
+        data = entry.get("data", {})
+        lane = data.get("lane")
+        if entry.get("type") != "transition" or not lane:
+            continue
+        owner = entry_conversation_id(entry)
+        if owner and owner != conv_id:
+            continue
+        summary = lanes.setdefault(lane, {"lane": lane, "agents": [], "transitions": 0, "state": "MAIN"})
+        summary["transitions"] += 1
+        summary["state"] = data.get("state")
+        if data.get("state") not in ["MAIN", "BASH"] and data.get("state") not in summary["agents"]:
+            summary["agents"].append(data.get("state"))
+    return list(lanes.values())
+
+
+def load_lanes(session_path, last_state):
+    """Read state.lanes.json: the current state of the main lane and of every open lane
+
+    {"next_lane": n, "lanes": {"main": {"state": ...}, "lane_001": {"state": ..., "conversation": ...}}}
+
+    Sessions from before lanes existed are seeded from the last state entry
+    (last_state is a callable so the log is only read in that case).
+    """
+    try:
+        return json.loads((Path(session_path) / LANES_FILE).read_text(encoding='utf-8'))
+    except (FileNotFoundError, ValueError):
+        state = last_state().get('data', {}).get("state", "MAIN")
+        return {"next_lane": 1, "lanes": {MAIN_LANE: {"state": state}}}
+
+
+def save_lanes(session_path, lanes):
+    """Persist lane states (callers hold the session lock)"""
+    write_atomic(Path(session_path) / LANES_FILE, json.dumps(lanes, ensure_ascii=False))
+
+
+def active_conversation(session_path):
+    """Return the active conversation directory of a session, or None
+
+    Reads the conversations/.current_conversation pointer; sessions without one
+    fall back to the highest-numbered conv_* directory.
+    """
+    conv_dir = Path(session_path) / 'conversations'
+    try:
+        conv_id = (conv_dir / '.current_conversation').read_text(encoding='utf-8').strip()
+        if conv_id:
+            return conv_dir / conv_id
+    except FileNotFoundError:
+        pass
+    if not conv_dir.exists():
+        return None
+    existing_convs = list(conv_dir.glob('conv_*'))
+    return max(existing_convs, key=conversation_number) if existing_convs else None
+
+
+class SessionCache:
+    """In-memory view of session pointers and state logs, reused across daemon requests.
+
+    Every cached value is keyed by the (size, mtime) of the file it came from, so
+    writes made outside the daemon are picked up on the next request.
+    """
+
+    def __init__(self):
+        self.pointers = {}
+        self.last_states = {}
+        self.stores = {}
+
+    @staticmethod
+    def _stamp(path):
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_size, st.st_mtime_ns)
+
+    def session_path(self, cwd):
+        """Resolve the session pointer of cwd, rereading it only when it changed"""
+        pointer = Path(cwd) / '.asm' / '.current_asm_session'
+        stamp = self._stamp(pointer)
+        if stamp is None:
+            return None
+        cached = self.pointers.get(pointer)
+        if cached and cached[0] == stamp:
+            return cached[1]
+        session_path = pointer.read_text().strip()
+        self.pointers[pointer] = (stamp, session_path)
+        return session_path
+
+    def store(self, session_path):
+        """Reuse one open store per session (and backend, which can change on migration)"""
+        backend = open_store(session_path).backend
+        store = self.stores.get(session_path)
+        if store is None or store.backend != backend:
+            if store is not None:
+                store.close()
+            store = self.stores[session_path] = open_store(session_path, backend)
+        return store
+
+    def last_state(self, store):
+        """Return the last state entry, rereading it only when the store changed"""
+        stamp = store.stamp()
+        if stamp is None:
+            return store.last_state()
+        cached = self.last_states.get(store.session_path)
+        if cached and cached[0] == stamp:
+            return cached[1]
+        entry = store.last_state()
+        self.last_states[store.session_path] = (stamp, entry)
+        return entry
+
+    def remember(self, store, entry):
+        """Record an entry we just appended so the next lookup skips the read"""
+        self.last_states[store.session_path] = (store.stamp(), entry)
+
+
+def session_store(session_path, cache=None):
+    """Open the store of a session, through the cache when one is given"""
+    return cache.store(session_path) if cache is not None else open_store(session_path)
+
+
+# Loaded generate-agent-list.py modules keyed by path, reloaded when the file changes
+_generators = {}
+
+
+def load_generator(path):
+    """Import generate-agent-list.py (not a valid module name) from path"""
+    import importlib.util
+
+    stamp = os.stat(path).st_mtime_ns
+    cached = _generators.get(str(path))
+    if cached and cached[0] == stamp:
+        return cached[1]
+    spec = importlib.util.spec_from_file_location("generate_agent_list", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    _generators[str(path)] = (stamp, module)
+    return module
+
+
+def init_session(name, cwd, cache=None, backend=None):
+    """Initialize ASM session
+
+    backend selects the session store ('jsonl' or 'sqlite'); defaults to $ASM_STORE or jsonl.
+    """
+    # Session path is in the working directory under .asm/
+    parent_path = Path(cwd) / '.asm'
+    parent_path.mkdir(parents=True, exist_ok=True)
+
+    if name:
+        # Use specified name under parent_path
+        session_path = str(parent_path / name)
+    else:
+        # Use default with timestamp under parent_path
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        session_path = str(parent_path / f"session_{timestamp}")
+
+    # Create directories and save session path
+    os.makedirs(f"{session_path}/conversations", exist_ok=True)
+    asm_trace.set_session(session_path)
+
+    # Save session pointer in parent_path
+    session_pointer_file = parent_path / '.current_asm_session'
+    session_pointer_file.write_text(session_path)
+
+    # Create the conversation index (messages.jsonl or session.db)
+    with span("store_create"):
+        store = open_store(session_path, backend or os.environ.get('ASM_STORE', 'jsonl'))
+        store.create()
+
+    # Link the shared agent catalog (built by the generator only when the agents changed)
+    home_dir = Path.home()
+    generator = home_dir / '.claude' / 'scripts' / 'generate-agent-list.py'
+    catalog_id = None
+    if generator.exists():
+        with span("generator"):
+            catalog_id = load_generator(generator).install_catalog(session_path)
+
+    # Count agents from agent-list.txt
+    agent_description_file = Path(session_path) / 'AGENT_DIRECTORY.md'
+    agent_list_file = Path(session_path) / 'agent-list.txt'
+
+    # Initialize state.jsonl with BASH state (system initialization)
+    bash_init_entry = {
+        "timestamp": datetime.now().isoformat(),
+        "type": "initialization",
+        "session_path": session_path,
+        "session": 'system',  # Always 'system' during initialization
+        "data": {
+            "previous_state": '',
+            "state": "BASH",
+            'trigger': 'init',
+            'agent_list_file': str(agent_list_file) if agent_list_file.exists() else "",
+            'agent_description_file': str(agent_description_file) if agent_description_file.exists() else "",
+            'agent_catalog': catalog_id or "",
+            "permissions": INIT_PERMISSIONS
+        }
+    }
+
+    with span("state_write"), session_lock(session_path):
+        store.reset_state(bash_init_entry)
+        # Lanes belong to the previous state history
+        (Path(session_path) / LANES_FILE).unlink(missing_ok=True)
+    store.close()
+    if cache is not None:
+        cache.remember(cache.store(session_path), bash_init_entry)
+
+    return {"result": bash_init_entry, "prefix": "✅ ASM Initialized Successfully"}
+
+
+def start_conversation(cwd, cache=None):
+    """Start new conversation"""
+    with span("session_lookup"):
+        session_path = cache.session_path(cwd) if cache is not None else get_session_path(cwd)
+    if not session_path:
+        return error("No active session")
+    asm_trace.set_session(session_path)
+
+    # Allocate the next conversation ID (also creates its outputs directory)
+    with span("conversation_allocate"):
+        conv_id = allocate_conversation(session_path)
+    workspace = f"{session_path}/conversations/{conv_id}/outputs"
+
+    # Remember where this conversation's slice of the state log begins
+    with span("state_mark"):
+        store = session_store(session_path, cache)
+        mark = {"backend": store.backend, "generation": store.generation(), "position": store.position()}
+        write_atomic(Path(session_path) / 'conversations' / conv_id / STATE_MARK_FILE, json.dumps(mark))
+    if cache is None:
+        store.close()
+
+    # Create dialogue.md file - IMPORTANT for recording
+    dialogue_path = f"{session_path}/conversations/{conv_id}/dialogue.md"
+    with span("dialogue_write"), open(dialogue_path, 'w') as f:
+        f.write(f"# Conversation: {conv_id}\n\n")
+        f.write(f"Started: {datetime.now().isoformat()}\n\n")
+
+    return {
+        "result": {
+            "status": "conversation_started",
+            "conversation_id": conv_id,
+            "workspace": workspace,
+            "dialogue_path": dialogue_path,
+            "message": f"Conversation {conv_id} initialized"
+        },
+        "prefix": "Conversation initialized:"
+    }
+
+
+def transition_to(new_state, trigger, cwd, cache=None, lane=None):
+    """Record state transition
+
+    Without a lane the transition moves the main lane, as before. With a lane
+    ID it moves that lane's own MAIN -> agent -> MAIN sub-history instead, so
+    parallel delegations never take their previous state from each other;
+    lane "new" allocates the next lane_NNN ID, and any other unknown ID
+    (including lanes closed by end_conversation) is an error. Each lane stays
+    attached to the conversation that was active when it opened.
+    """
+    with span("session_lookup"):
+        session_path = cache.session_path(cwd) if cache is not None else get_session_path(cwd)
+    if not session_path:
+        return error("No active session")
+    asm_trace.set_session(session_path)
+
+    # Get current state
+    store = session_store(session_path, cache)
+    if not store.exists():
+        return error("State file not found")
+
+    # Reading the lane's previous state and appending must not interleave with
+    # other lanes doing the same
+    with session_lock(session_path):
+        with span("state_read"):
+            lanes = load_lanes(session_path, lambda: cache.last_state(store) if cache is not None else store.last_state())
+
+        # Find active conversation workspace from the conversation pointer
+        with span("conversation_lookup"):
+            latest_conv = active_conversation(session_path)
+
+        if lane == "new":
+            lane = f"lane_{lanes['next_lane']:0{LANE_ID_WIDTH}d}"
+            lanes["next_lane"] += 1
+            # A new lane forks from MAIN in the active conversation
+            lanes["lanes"][lane] = {"state": "MAIN", "conversation": latest_conv.name if latest_conv else None}
+        elif lane and lane not in lanes["lanes"]:
+            # Typos and lanes closed by end_conversation do not resolve
+            return error(f"Unknown lane: {lane}")
+        current = lanes["lanes"][lane or MAIN_LANE]
+        if lane and current.get("conversation"):
+            latest_conv = Path(session_path) / 'conversations' / current["conversation"]
+
+        state_entry = transition_entry(new_state, trigger, session_path, current["state"], latest_conv, lane)
+        with span("state_append"):
+            store.append_state(state_entry)
+        current["state"] = new_state
+        save_lanes(session_path, lanes)
+
+    if cache is not None and not lane:
+        cache.remember(store, state_entry)
+    if cache is None:
+        store.close()
+
+    return {"result": state_entry, "prefix": "State transition recorded:"}
+
+
+def state_permissions(state):
+    """(session, permissions) of a state"""
+    if state == "MAIN":
+        return 'dialogue', MAIN_PERMISSIONS
+    if state == "BASH":
+        return 'system', BASH_PERMISSIONS
+    # Any other state is considered an agent (e.g., consolidated-fullstack-data-engineer)
+    return 'execution', AGENT_PERMISSIONS
+
+
+def transition_entry(new_state, trigger, session_path, previous_state, conv_path=None, lane=None):
+    """Build the state entry of a transition"""
+    if conv_path:
+        workspace = str(conv_path / 'outputs')
+        dialogue_path = str(conv_path / 'dialogue.md')
+    else:
+        # Fallback to session_path if no conversation found
+        workspace = session_path
+        dialogue_path = None
+
+    # Determine permissions and session based on state
+    session, permissions = state_permissions(new_state)
+
+    # Record transition
+    state_entry = {
+        "timestamp": datetime.now().isoformat(),
+        "type": "transition",
+        "session_path": session_path,
+        "session": session,
+        "data": {
+            "previous_state": previous_state,
+            "state": new_state,
+            "trigger": trigger,
+            "workspace": workspace,
+            "dialogue_path": dialogue_path,
+            "permissions": permissions
+        }
+    }
+    if lane:
+        state_entry["data"]["lane"] = lane
+    return state_entry
+
+
+def end_conversation(summary, cwd, cache=None):
+    """End conversation and update messages.jsonl"""
+    with span("session_lookup"):
+        session_path = cache.session_path(cwd) if cache is not None else get_session_path(cwd)
+    if not session_path:
+        return error("No active session")
+    asm_trace.set_session(session_path)
+
+    # Find active conversation from the conversation pointer
+    conv_dir = Path(session_path) / 'conversations'
+    if not conv_dir.exists():
+        return error("No conversations directory found")
+
+    # Get the active conversation
+    with span("conversation_lookup"):
+        latest_conv = active_conversation(session_path)
+    if not latest_conv:
+        return error("No conversations found")
+
+    conv_id = latest_conv.name
+    workspace = str(latest_conv / 'outputs')
+
+    # Collect agents used from this conversation's slice of the state log only,
+    # merging its lanes and closing them so their IDs no longer resolve
+    store = session_store(session_path, cache)
+    ended_at = datetime.now()
+    with span("agent_activity"), session_lock(session_path):
+        entries = list(store.iter_states(conversation_start(latest_conv, store)))
+        activity = agent_activity(entries, conv_id, ended_at)
+        lanes = lane_history(entries, conv_id)
+        if lanes or (Path(session_path) / LANES_FILE).exists():
+            lane_states = load_lanes(session_path, store.last_state)
+            lane_states["lanes"] = {lane_id: info for lane_id, info in lane_states["lanes"].items()
+                                    if info.get("conversation") != conv_id}
+            save_lanes(session_path, lane_states)
+    agents_used = [stats["agent"] for stats in activity]
+
+    # List files created anywhere under outputs, hashed incrementally via the manifest
+    import asm_manifest
+    outputs_dir = Path(workspace)
+    files_created = []
+    if outputs_dir.exists():
+        with span("manifest"):
+            manifest, _ = asm_manifest.update_manifest(outputs_dir, latest_conv / asm_manifest.MANIFEST_FILE)
+            asm_manifest.record_duplicates(conv_dir / asm_manifest.CONTENT_INDEX_FILE, outputs_dir, manifest)
+        for rel_path, info in manifest.items():
+            file = outputs_dir / rel_path
+            files_created.append({
+                "path": str(file),
+                "summary": f"{file.suffix[1:] if file.suffix else 'unknown'} file",
+                **{key: info[key] for key in ("size", "type", "sha256", "duplicate_of") if key in info}
+            })
+
+    # Update the conversation index (messages.jsonl or session.db)
+    message_entry = {
+        "conversation_id": conv_id,
+        "timestamp": ended_at.isoformat(),
+        "summary": summary or "Conversation completed",
+        "files_created": files_created,
+        "agents_used": agents_used,
+        "agent_activity": activity
+    }
+    if lanes:
+        message_entry["lanes"] = lanes
+
+    with span("message_append"):
+        store.append_message(message_entry)
+    if cache is None:
+        store.close()
+
+    # Update dialogue.md with end marker
+    dialogue_path = Path(session_path) / 'conversations' / conv_id / 'dialogue.md'
+    if dialogue_path.exists():
+        with span("dialogue_write"), open(dialogue_path, 'a') as f:
+            f.write(f"\n## Conversation Ended: {datetime.now().isoformat()}\n")
+            f.write(f"Summary: {summary}\n\n")
+        # Keep the cross-session search index current with the finished dialogue
+        # The dialogue is already written; a failed index update must not fail the command
+        try:
+            with span("search_index"):
+                import asm_search
+                asm_search.index_conversation(dialogue_path)
+        except Exception as e:
+            print(f"⚠️ Could not update the search index for {dialogue_path}: {e}", file=sys.stderr)
+
+    # Pack conversations nobody has touched for ASM_ARCHIVE_AFTER days, at most once a day
+    import asm_archive
+    archived = []
+    if asm_archive.ARCHIVE_AFTER_DAYS > 0 and asm_archive.sweep_due(session_path):
+        with span("archive"):
+            archived = asm_archive.sweep(session_path)["due"]
+
+    return {
+        "result": {
+            "status": "conversation_ended",
+            "conversation_id": conv_id,
+            "summary": summary,
+            "files_created": len(files_created),
+            "agents_used": agents_used,
+            "agent_activity": activity,
+            "lanes": lanes,
+            "archived": archived,
+            "message": f"Conversation {conv_id} ended successfully"
+        }
+    }
+
+
+def render_todo(scenario):
+    """Render the todo list text of a scenario"""
+    import asm_todo
+    return {"text": asm_todo.render_scenario(scenario)}
+
+
+# Commands `asm.py run` executes for each scenario. They are the leading command
+# steps of the scenario's asm_todo list, so the rest of that list is what remains
+# for the caller to do.
+RUN_SCENARIOS = {
+    "init": lambda args: [("init", args)],
+    "start_conversation": lambda args: [("start", []), ("transition", ["MAIN", "start_conversation"])],
+    "transition_to_agent": lambda args: [("transition", args)],
+    "end_conversation": lambda args: [("end", args)],
+    "end_session": lambda args: [("transition", ["BASH", "session_end"])],
+}
+
+
+def run_scenario(scenario, args, cwd, cache=None):
+    """Execute the deterministic steps of an asm_todo scenario and combine their results
+
+    Stops at the first failing step. The combined result carries every step's
+    own result, the conversation and state they leave behind, and the todo
+    items left for the caller (delegating, recording the dialogue, ...).
+    """
+    import asm_todo
+
+    if scenario not in RUN_SCENARIOS:
+        return error(f"Unknown scenario: {scenario} (valid: {', '.join(RUN_SCENARIOS)})")
+    steps = []
+    context = {}
+    for command, step_args in RUN_SCENARIOS[scenario](args):
+        with span(f"run_{command}"):
+            result = run_command(command, step_args, cwd, cache)["result"]
+        steps.append({"command": command, "args": step_args, "result": result})
+        if result.get("status") == "error":
+            return {
+                "result": {
+                    "status": "error",
+                    "scenario": scenario,
+                    "failed": command,
+                    "message": result.get("message", ""),
+                    "steps": steps
+                }
+            }
+        data = result.get("data", {})
+        for key in ("session_path", "conversation_id", "workspace", "dialogue_path", "state"):
+            value = result.get(key, data.get(key))
+            if value:
+                context[key] = value
+
+    todos = asm_todo.SCENARIOS[scenario][0]() if scenario in asm_todo.SCENARIOS else []
+    return {
+        "result": {
+            "status": "completed",
+            "scenario": scenario,
+            **context,
+            "steps": steps,
+            "next": todos[len(steps):]
+        },
+        "prefix": f"Scenario {scenario} completed:"
+    }
+
+
+def check_permissions(kind, items, cwd, cache=None, state=None, lane=None):
+    """Check a batch of file writes (kind 'write') or commands (kind 'exec') against a state's permissions
+
+    The state defaults to the current state of the lane (the main lane without one).
+    """
+    import asm_permissions
+
+    if state is None:
+        with span("session_lookup"):
+            session_path = cache.session_path(cwd) if cache is not None else get_session_path(cwd)
+        if not session_path:
+            return error("No active session (pass --state=NAME)")
+        asm_trace.set_session(session_path)
+        store = session_store(session_path, cache)
+        with span("state_read"):
+            lanes = load_lanes(session_path, lambda: cache.last_state(store) if cache is not None else store.last_state())
+        if cache is None:
+            store.close()
+        if (lane or MAIN_LANE) not in lanes["lanes"]:
+            return error(f"Unknown lane: {lane}")
+        state = lanes["lanes"][lane or MAIN_LANE]["state"]
+
+    permissions = state_permissions(state)[1]
+    with span("permission_check"):
+        if kind == "write":
+            results = asm_permissions.check_paths(permissions, items, str(cwd))
+        else:
+            results = asm_permissions.check_commands(permissions, items, str(cwd))
+    denied = sum(1 for item in results if not item["allowed"])
+    return {
+        "result": {
+            "state": state,
+            "kind": kind,
+            "profile": asm_permissions.profile_hash(permissions),
+            "checked": len(results),
+            "denied": denied,
+            "results": results
+        }
+    }
+
+
+def run_command(command, args, cwd, cache=None):
+    """Execute one ASM command in-process and return its response"""
+    if command == "init":
+        if not args:
+            return error("Usage: asm_init.py <project_name> <mode>")
+        options = dict(arg[2:].split('=', 1) for arg in args if arg.startswith('--') and '=' in arg)
+        if options.get('store', 'jsonl') not in BACKENDS:
+            return error(f"Unknown store backend: {options['store']}")
+        return init_session(args[0], cwd, cache, options.get('store'))
+    if command == "start":
+        return start_conversation(cwd, cache)
+    if command == "transition":
+        options = dict(arg[2:].split('=', 1) for arg in args if arg.startswith('--lane='))
+        args = [arg for arg in args if not arg.startswith('--lane=')]
+        if not args:
+            return error("Usage: asm_transition_to.py <new_state> [trigger] [--lane=ID|new]")
+        return transition_to(args[0], args[1] if len(args) > 1 else "", cwd, cache, options.get('lane'))
+    if command == "end":
+        return end_conversation(" ".join(args), cwd, cache)
+    if command == "todo":
+        return render_todo(args[0] if args else "")
+    if command == "run":
+        if not args:
+            return error(f"Usage: asm.py run <scenario> [args...] (scenarios: {', '.join(RUN_SCENARIOS)})")
+        return run_scenario(args[0], args[1:], cwd, cache)
+    if command == "check":
+        options = dict(arg[2:].split('=', 1) for arg in args if arg.startswith(('--state=', '--lane=')))
+        args = [arg for arg in args if not arg.startswith(('--state=', '--lane='))]
+        if not args or args[0] not in ("write", "exec"):
+            return error("Usage: asm.py check write|exec <item>... [--state=NAME] [--lane=ID]")
+        return check_permissions(args[0], args[1:], cwd, cache, options.get('state'), options.get('lane'))
+    return error(f"Unknown command: {command}")
+
+
+def daemon_request(command, args, cwd):
+    """Send a command to the ASM daemon; returns None when no daemon is listening"""
+    if not DAEMON_SOCKET.exists():
+        return None
+    import socket
+    request = {"command": command, "args": list(args), "cwd": str(cwd)}
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(str(DAEMON_SOCKET))
+            sock.sendall(json.dumps(request, ensure_ascii=False).encode('utf-8') + b'\n')
+            sock.shutdown(socket.SHUT_WR)
+            chunks = []
+            while True:
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+    except OSError:
+        # Stale socket or daemon went away - fall back to in-process execution
+        return None
+    if not chunks:
+        return None
+    return json.loads(b''.join(chunks).decode('utf-8'))
+
+
+def emit(response):
+    """Print a command response the way the scripts always have"""
+    if "text" in response:
+        print(response["text"])
+    else:
+        output_json(response["result"], prefix_info=response.get("prefix", ""))
+
+
+def dispatch(command, args=None):
+    """Run a command through the daemon when available, otherwise in-process"""
+    args = list(args if args is not None else sys.argv[1:])
+    cwd = Path.cwd()
+    with asm_trace.command(command):
+        with span("daemon_request"):
+            response = daemon_request(command, args, cwd)
+        if response is None:
+            response = run_command(command, args, cwd)
+        with span("output"):
+            emit(response)
+        if asm_trace.ENABLED:
+            # Commands served by the daemon never resolved the session here
+            asm_trace.set_session(get_session_path(cwd), replace=False)
+    return response
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+ASM Daemon - Optional long-lived server that keeps session state in memory
+
+The asm_* scripts connect to this daemon over a Unix socket when it is running
+and fall back to in-process execution when it is not.
+
+Usage:
+    python3 asm_daemon.py [serve]    # run in the foreground
+    python3 asm_daemon.py status     # check whether a daemon is listening
+    python3 asm_daemon.py stop       # ask the running daemon to exit
+"""
+
+import json
+import os
+import socketserver
+import sys
+import threading
+
+import asm_core
+import asm_trace
+
+
+class ASMRequestHandler(socketserver.StreamRequestHandler):
+    """Handle one newline-delimited JSON request per connection"""
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        command = ""
+        try:
+            request = json.loads(line.decode('utf-8'))
+            command = request.get("command", "")
+            if command == "ping":
+                response = {"result": {"status": "ok", "pid": os.getpid()}}
+            elif command == "shutdown":
+                response = {"result": {"status": "stopping", "pid": os.getpid()}}
+            else:
+                # Commands touch shared session files, so run them one at a time
+                with self.server.lock, asm_trace.command(command, source="daemon"):
+                    response = asm_core.run_command(command, request.get("args", []),
+                                                    request.get("cwd", os.getcwd()), self.server.cache)
+        except Exception as e:
+            response = asm_core.error(f"Daemon error: {e}")
+        self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8'))
+        self.wfile.flush()
+        if command == "shutdown":
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+
+
+class ASMDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix socket server holding a shared SessionCache"""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path):
+        self.cache = asm_core.SessionCache()
+        self.lock = threading.Lock()
+        super().__init__(str(socket_path), ASMRequestHandler)
+
+
+def control(command):
+    """Send a control command to a running daemon"""
+    response = asm_core.daemon_request(command, [], os.getcwd())
+    if response is None:
+        asm_core.output_json({"status": "not_running", "socket": str(asm_core.DAEMON_SOCKET)})
+        return False
+    asm_core.output_json(response["result"])
+    return True
+
+
+def serve():
+    """Run the daemon in the foreground until stopped"""
+    socket_path = asm_core.DAEMON_SOCKET
+    if socket_path.exists():
+        if asm_core.daemon_request("ping", [], os.getcwd()) is not None:
+            asm_core.output_json({"status": "error", "message": f"Daemon already running on {socket_path}"})
+            return
+        # Leftover socket from a daemon that did not exit cleanly
+        socket_path.unlink()
+
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+    server = ASMDaemon(socket_path)
+    os.chmod(socket_path, 0o600)
+    print(f"🚀 ASM daemon listening on {socket_path} (pid {os.getpid()})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path.exists():
+            socket_path.unlink()
+        print("👋 ASM daemon stopped", flush=True)
+
+
+def main():
+    """Main entry point"""
+    action = sys.argv[1] if len(sys.argv) > 1 else "serve"
+
+    if action == "serve":
+        serve()
+    elif action == "status":
+        control("ping")
+    elif action == "stop":
+        control("shutdown")
+    else:
+        print(f"Unknown action: {action}")
+        print("Valid actions: serve, status, stop")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+ASM Manifest Module - Recursive, incremental content manifest of a conversation workspace
+
+Walks outputs/ with os.scandir, hashes new or changed files in a thread pool and
+reuses the hashes of files whose size and mtime match the previous manifest.
+Duplicates across the session are found through conversations/.content_index.db,
+a SQLite table keyed by content hash, so ending a conversation only looks up
+and inserts the hashes of its own files.
+
+Usage:
+    python3 asm_manifest.py <workspace> [manifest_path]
+"""
+
+import hashlib
+import json
+import mimetypes
+import os
+import sys
+from pathlib import Path
+
+from asm_store import write_atomic
+
+MANIFEST_FILE = 'manifest.json'
+CONTENT_INDEX_FILE = '.content_index.db'
+# Whole-file JSON index of earlier sessions, imported into the table on first use
+LEGACY_CONTENT_INDEX_FILE = '.content_index.json'
+HASH_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+CHUNK_SIZE = 1024 * 1024
+
+
+def walk_files(root):
+    """Yield (relative_path, stat) for every regular file below root, without following symlinks"""
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield os.path.relpath(entry.path, root), entry.stat(follow_symlinks=False)
+        except (FileNotFoundError, PermissionError):
+            continue
+
+
+def hash_file(path):
+    """SHA-256 of a file plus a content type guessed from its name or first bytes"""
+    digest = hashlib.sha256()
+    head = b''
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            if not head:
+                head = chunk[:8192]
+            digest.update(chunk)
+    content_type = mimetypes.guess_type(path)[0]
+    if not content_type:
+        content_type = 'text/plain' if looks_like_text(head) else 'application/octet-stream'
+    return digest.hexdigest(), content_type
+
+
+def looks_like_text(head):
+    """Whether the first bytes of a file read as UTF-8 text"""
+    if b'\0' in head:
+        return False
+    try:
+        head.decode('utf-8')
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off by the sample boundary is still text
+        return e.start >= len(head) - 3
+    return True
+
+
+def load_manifest(path):
+    """Load a manifest, or {} when there is none"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('files', {})
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def build_manifest(workspace, previous=None, workers=HASH_WORKERS):
+    """Describe every file below workspace as {relative_path: {size, mtime_ns, type, sha256}}
+
+    Returns (files, rehashed) where rehashed counts the files that had to be read.
+    """
+    previous = previous or {}
+    files = {}
+    pending = []
+    for rel_path, st in walk_files(workspace):
+        old = previous.get(rel_path)
+        if old and old['size'] == st.st_size and old['mtime_ns'] == st.st_mtime_ns:
+            files[rel_path] = old
+            continue
+        files[rel_path] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+        pending.append(rel_path)
+
+    def hash_or_none(rel_path):
+        try:
+            return hash_file(os.path.join(workspace, rel_path))
+        except OSError:
+            # Removed or unreadable since the walk
+            return None
+
+    if pending:
+        # concurrent.futures is a heavy import and unchanged workspaces never need it
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for rel_path, result in zip(pending, pool.map(hash_or_none, pending)):
+                if result is None:
+                    del files[rel_path]
+                    continue
+                digest, content_type = result
+                files[rel_path].update({"type": content_type, "sha256": digest})
+    return dict(sorted(files.items())), len(pending)
+
+
+def update_manifest(workspace, manifest_path):
+    """Rebuild and persist a workspace manifest, reusing the previous one"""
+    files, rehashed = build_manifest(workspace, load_manifest(manifest_path))
+    write_atomic(manifest_path, json.dumps({"workspace": str(workspace), "files": files}, ensure_ascii=False))
+    return files, rehashed
+
+
+def record_duplicates(index_path, workspace, files):
+    """Mark files whose content already appeared elsewhere in the session
+
+    The session-wide index maps each hash to the first path seen with it; files
+    matching a different path get a duplicate_of entry. Only the given files'
+    hashes are looked up and inserted, in one transaction. Returns the number
+    of duplicates found.
+    """
+    # Only conversations with outputs pay for the sqlite3 import
+    import sqlite3
+
+    index_path = Path(index_path)
+    legacy_path = index_path.with_name(LEGACY_CONTENT_INDEX_FILE)
+    conn = sqlite3.connect(index_path, timeout=30, isolation_level=None)
+    try:
+        conn.execute("CREATE TABLE IF NOT EXISTS content (sha256 TEXT PRIMARY KEY, path TEXT NOT NULL) WITHOUT ROWID")
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            legacy = json.loads(legacy_path.read_text(encoding='utf-8'))
+        except (FileNotFoundError, ValueError):
+            legacy = {}
+        conn.executemany("INSERT OR IGNORE INTO content VALUES (?, ?)", legacy.items())
+        duplicates = 0
+        for rel_path, info in files.items():
+            path = str(Path(workspace) / rel_path)
+            conn.execute("INSERT OR IGNORE INTO content VALUES (?, ?)", (info['sha256'], path))
+            first = conn.execute("SELECT path FROM content WHERE sha256 = ?", (info['sha256'],)).fetchone()[0]
+            if first != path:
+                info['duplicate_of'] = first
+                duplicates += 1
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+    legacy_path.unlink(missing_ok=True)
+    return duplicates
+
+
+def main():
+    """Command line interface"""
+    if len(sys.argv) < 2:
+        print("Usage: asm_manifest.py <workspace> [manifest_path]")
+        sys.exit(1)
+    workspace = Path(sys.argv[1])
+    manifest_path = Path(sys.argv[2]) if len(sys.argv) > 2 else workspace.parent / MANIFEST_FILE
+    files, rehashed = update_manifest(workspace, manifest_path)
+    print(json.dumps({
+        "manifest": str(manifest_path),
+        "files": len(files),
+        "rehashed": rehashed,
+        "bytes": sum(info['size'] for info in files.values())
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+ASM Permissions Module - Compiled permission profiles with batch path and command checks
+
+A profile is the permissions dict a state carries (MAIN_PERMISSIONS and the
+others in asm_core): can_write / cannot_write hold file globs, can_execute /
+cannot_execute hold command words. Each list compiles into one alternation
+regex whose named groups tell which rule matched, and compiled profiles are
+cached by the hash of the profile, so the daemon compiles each profile once.
+
+Deny rules win over allow rules and an item no rule allows is denied.
+Commands are also denied for command substitution, for redirecting into a
+file the profile may not write, and for the arguments in UNSAFE_ARGUMENTS. Entries
+that are prose rather than patterns are mapped to a predicate (PATH_KEYWORDS)
+or to the programs of a verb (COMMAND_VERBS); the rest only document the state.
+"""
+
+import hashlib
+import json
+import os
+import re
+
+# Prose entries of the write lists that are checks on the file itself
+PATH_KEYWORDS = {
+    "non-executable files": lambda path: not is_executable(path),
+    "any executable file": lambda path: is_executable(path),
+}
+
+# Programs behind the verbs of can_execute
+COMMAND_VERBS = {
+    "read": ["cat", "head", "tail", "less", "more", "wc", "file", "stat"],
+    "list": ["ls", "tree", "du", "pwd", "find"],
+    "search": ["grep", "rg", "ag", "find", "fd", "locate"],
+    "analyze": ["diff", "cmp", "jq", "sort", "uniq", "cut", "md5sum", "sha256sum"],
+}
+
+# Command and process substitution run commands no rule has seen
+SUBSTITUTION_RE = re.compile(r'\$\(|`|[<>]\(')
+NULL_DEVICE = '/dev/null'
+
+# Arguments that make an allowed program run commands or write and delete files
+UNSAFE_ARGUMENTS = {
+    "find": ("-exec", "-execdir", "-ok", "-okdir", "-delete", "-fprint", "-fprint0", "-fprintf", "-fls"),
+    "fd": ("-x", "--exec", "-X", "--exec-batch"),
+    "sort": ("-o", "--output"),
+}
+
+# Compiled profiles by profile hash
+_compiled = {}
+
+
+def is_executable(path):
+    """Whether path is an existing regular file with an execute bit"""
+    return os.path.isfile(path) and os.access(path, os.X_OK)
+
+
+def profile_hash(permissions):
+    """Stable hash of a permission profile"""
+    return hashlib.sha256(json.dumps(permissions, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+def glob_regex(pattern):
+    """Regex for a file glob ('*' and '?' stop at slashes, '**' does not)"""
+    parts = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith('**', i):
+            parts.append('.*')
+            i += 2
+            continue
+        if char == '*':
+            parts.append('[^/]*')
+        elif char == '?':
+            parts.append('[^/]')
+        elif char == '[' and ']' in pattern[i + 2:]:
+            end = pattern.index(']', i + 2)
+            body = pattern[i + 1:end]
+            parts.append('[' + ('^' + body[1:] if body.startswith('!') else body).replace('\\', '\\\\') + ']')
+            i = end
+        else:
+            parts.append(re.escape(char))
+        i += 1
+    return ''.join(parts)
+
+
+def combine(branches):
+    """One regex over (rule index, regex) branches; lastgroup names the matching rule"""
+    if not branches:
+        return None
+    return re.compile('|'.join(f'(?P<r{index}>{regex})' for index, regex in branches), re.DOTALL)
+
+
+class Rules:
+    """One allow or deny list compiled into a single matcher
+
+    Globs without a slash match the file name in any directory, so they are
+    combined into a regex over the last path component; globs with a slash
+    match the whole path. Command rules match single words.
+    """
+
+    __slots__ = ('kind', 'rules', 'name_regex', 'path_regex', 'predicates')
+
+    def __init__(self, kind, rules, name_regex, path_regex, predicates):
+        self.kind = kind
+        self.rules = rules
+        self.name_regex = name_regex
+        self.path_regex = path_regex
+        self.predicates = predicates
+
+    def match(self, item, subject=None):
+        """The rule matching item (predicates see subject), or None"""
+        if self.name_regex is not None:
+            found = self.name_regex.fullmatch(item.rpartition('/')[2] if self.kind == 'path' else item)
+            if found:
+                return self.rules[int(found.lastgroup[1:])]
+        if self.path_regex is not None:
+            found = self.path_regex.fullmatch(item)
+            if found:
+                return self.rules[int(found.lastgroup[1:])]
+        for rule, predicate in self.predicates:
+            if predicate(item if subject is None else subject):
+                return rule
+        return None
+
+
+def compile_rules(entries, kind):
+    """Compile a write list (kind 'path') or an execute list (kind 'command')"""
+    rules, name_branches, path_branches, predicates = [], [], [], []
+    for entry in entries:
+        if kind == 'path' and entry in PATH_KEYWORDS:
+            predicates.append((entry, PATH_KEYWORDS[entry]))
+            continue
+        if ' ' in entry:
+            # Prose such as "information-gathering functions only"
+            continue
+        if entry == '*':
+            path_branches.append((len(rules), '.*'))
+        elif kind == 'path':
+            (path_branches if '/' in entry else name_branches).append((len(rules), glob_regex(entry)))
+        else:
+            words = [entry] + COMMAND_VERBS.get(entry, [])
+            name_branches.append((len(rules), '|'.join(re.escape(word) for word in words)))
+        rules.append(entry)
+    return Rules(kind, rules, combine(name_branches), combine(path_branches), predicates)
+
+
+class Profile:
+    """A compiled permission profile"""
+
+    def __init__(self, permissions):
+        self.hash = profile_hash(permissions)
+        self.write_allow = compile_rules(permissions.get("can_write", []), 'path')
+        self.write_deny = compile_rules(permissions.get("cannot_write", []), 'path')
+        self.exec_allow = compile_rules(permissions.get("can_execute", []), 'command')
+        self.exec_deny = compile_rules(permissions.get("cannot_execute", []), 'command')
+
+    def check_path(self, path, cwd=None):
+        """{"item", "allowed", "rule"} for writing one path"""
+        normalized = os.path.normpath(path).replace(os.sep, '/')
+        on_disk = os.path.join(cwd, path) if cwd else path
+        rule = self.write_deny.match(normalized, on_disk)
+        if rule is not None:
+            return {"item": path, "allowed": False, "rule": rule}
+        rule = self.write_allow.match(normalized, on_disk)
+        return {"item": path, "allowed": rule is not None, "rule": rule}
+
+    def check_command(self, command, cwd=None):
+        """{"item", "allowed", "rule"} for running one shell command line
+
+        Command substitutions are refused outright and redirection targets
+        must be writable paths. Each simple command's program must not match
+        the deny list, must be allowed, and must not be given an argument of
+        UNSAFE_ARGUMENTS.
+        """
+        if SUBSTITUTION_RE.search(command):
+            return {"item": command, "allowed": False, "rule": "command substitution"}
+        try:
+            commands = split_command(command)
+        except ValueError as e:
+            return {"item": command, "allowed": False, "rule": str(e)}
+        allowed_by = None
+        for words, targets in commands:
+            for target in targets:
+                if target != NULL_DEVICE:
+                    checked = self.check_path(target, cwd)
+                    if not checked["allowed"]:
+                        return {"item": command, "allowed": False, "rule": checked["rule"]}
+            if not words:
+                continue
+            program = os.path.basename(words[0])
+            rule = self.exec_deny.match(program)
+            if rule is not None:
+                return {"item": command, "allowed": False, "rule": rule}
+            rule = self.exec_allow.match(program)
+            if rule is None:
+                return {"item": command, "allowed": False, "rule": None}
+            if rule != '*':
+                for word in words[1:]:
+                    argument = unsafe_argument(program, word)
+                    if argument is not None:
+                        return {"item": command, "allowed": False, "rule": f"{program} {argument}"}
+            allowed_by = allowed_by or rule
+        return {"item": command, "allowed": allowed_by is not None, "rule": allowed_by}
+
+
+def split_command(command):
+    """[(words, redirection targets)] of the simple commands of a shell command line
+
+    Quotes and backslash escapes are removed the way the shell removes them,
+    so '-exec', -ex""ec and "run.py" are seen as the words they run as.
+    Operators only separate commands outside quotes. Descriptor duplications
+    ("2>&1") and input redirections are dropped. Raises ValueError for an
+    unterminated quote.
+    """
+    commands = []
+    words, targets = [], []
+    word = None         # characters of the word being read, None between words
+    target = None       # None, "out" or "in": what the next word is the target of
+    i, length = 0, len(command)
+
+    def end_word():
+        nonlocal word, target
+        if word is not None:
+            if target == "out":
+                targets.append(''.join(word))
+            elif target is None:
+                words.append(''.join(word))
+            word, target = None, None
+
+    def end_command():
+        nonlocal words, targets
+        end_word()
+        if words or targets:
+            commands.append((words, targets))
+        words, targets = [], []
+
+    while i < length:
+        char = command[i]
+        if char == "'":
+            end = command.find("'", i + 1)
+            if end < 0:
+                raise ValueError("unterminated quote")
+            word = (word or []) + list(command[i + 1:end])
+            i = end + 1
+        elif char == '"':
+            word = word or []
+            i += 1
+            while True:
+                if i >= length:
+                    raise ValueError("unterminated quote")
+                if command[i] == '"':
+                    break
+                if command[i] == '\\' and i + 1 < length and command[i + 1] in '"\\$`\n':
+                    i += 1
+                word.append(command[i])
+                i += 1
+            i += 1
+        elif char == '\\':
+            word = (word or []) + list(command[i + 1:i + 2])
+            i += 2
+        elif char in ' \t':
+            end_word()
+            i += 1
+        elif char in ';\n':
+            end_command()
+            i += 1
+        elif char == '|':
+            end_command()
+            i += 2 if command.startswith('||', i) else 1
+        elif char == '&' and command.startswith('&>', i):
+            end_word()
+            target = "out"
+            i += 3 if command.startswith('&>>', i) else 2
+        elif char == '&':
+            end_command()
+            i += 2 if command.startswith('&&', i) else 1
+        elif char in '<>':
+            if word is not None and ''.join(word).isdigit():
+                # The descriptor number of "2>file"
+                word = None
+            end_word()
+            i += 1
+            if char == '>' and i < length and command[i] in '>|':
+                i += 1
+            elif char == '<' and i < length and command[i] == '<':
+                i += 1
+            if char == '>' and command.startswith('&', i):
+                i += 1
+                duplicate = re.match(r'\d+-?|-', command[i:])
+                if duplicate:
+                    # "2>&1" or ">&-" duplicates or closes a descriptor
+                    i += duplicate.end()
+                    continue
+            target = "out" if char == '>' else "in"
+        else:
+            word = (word or []) + [char]
+            i += 1
+    end_command()
+    return commands
+
+
+def unsafe_argument(program, word):
+    """The UNSAFE_ARGUMENTS entry of program that word gives, or None
+
+    Matches "--output=FILE" and attached short options such as "-oFILE" or "-ro".
+    """
+    for argument in UNSAFE_ARGUMENTS.get(program, ()):
+        if word == argument or word.startswith(argument + '='):
+            return argument
+        if (len(argument) == 2 and argument[1] != '-' and word.startswith('-')
+                and not word.startswith('--') and argument[1] in word[1:]):
+            return argument
+    return None
+
+
+def compile_profile(permissions):
+    """Compiled profile of a permissions dict, cached by profile hash"""
+    key = profile_hash(permissions)
+    profile = _compiled.get(key)
+    if profile is None:
+        profile = _compiled[key] = Profile(permissions)
+    return profile
+
+
+def check_paths(permissions, paths, cwd=None):
+    """Check a batch of file writes; relative paths are resolved against cwd for file predicates"""
+    profile = compile_profile(permissions)
+    return [profile.check_path(path, cwd) for path in paths]
+
+
+def check_commands(permissions, commands, cwd=None):
+    """Check a batch of shell command lines; redirection targets are resolved against cwd"""
+    profile = compile_profile(permissions)
+    return [profile.check_command(command, cwd) for command in commands]
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+ASM Replay Module - Stream a session's history with filters, in constant memory
+
+replay_states() and replay_messages() are generators over the state log and the
+conversation index. On JSONL sessions every log file (state.jsonl, each sealed
+segment, messages.jsonl) gets a sparse block index beside it (<file>.idx.json):
+one record per BLOCK_ENTRIES lines with the block's byte range, timestamp range,
+states and conversation IDs. Queries seek straight to the blocks that can match
+instead of starting from byte 0, and the index is extended incrementally as the
+log grows. SQLite sessions answer the same filters from their own indexes.
+
+Usage:
+    python3 asm_replay.py [states|messages] [--since=ISO] [--until=ISO] [--state=NAME]
+                          [--trigger=TEXT] [--conversation=conv_XXXXXX] [--lane=ID]
+                          [--format=jsonl|csv|columns] [--output=PATH] [--session=PATH]
+
+--format=columns writes a directory with one JSONL file per column plus schema.json.
+"""
+
+import csv
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+
+from asm_store import SegmentDictionary, current_session_path, entry_conversation_id, open_store, read_segment_header
+
+INDEX_VERSION = 1
+BLOCK_ENTRIES = 1024
+HEAD_BYTES = 4096
+
+STATE_COLUMNS = ["timestamp", "type", "session", "previous_state", "state", "trigger", "conversation_id", "lane",
+                 "workspace"]
+MESSAGE_COLUMNS = ["conversation_id", "timestamp", "summary", "files_created", "agents_used"]
+
+
+class Filters:
+    """Replay filters; all given ones must match"""
+
+    def __init__(self, since=None, until=None, state=None, trigger=None, conversation=None, lane=None):
+        self.since = since
+        self.until = until
+        self.state = state
+        self.trigger = trigger.lower() if trigger else None
+        self.conversation = conversation
+        self.lane = lane
+
+    def block_may_match(self, block):
+        """Whether a block's summary rules out every entry in it"""
+        if self.since and block['max_ts'] < self.since:
+            return False
+        if self.until and block['min_ts'] >= self.until:
+            return False
+        if self.state and self.state not in block['states']:
+            return False
+        if self.conversation and self.conversation not in block['conversations']:
+            return False
+        return True
+
+    def match_state(self, entry):
+        data = entry.get('data', {})
+        timestamp = entry.get('timestamp', '')
+        if (self.since and timestamp < self.since) or (self.until and timestamp >= self.until):
+            return False
+        if self.state and data.get('state') != self.state:
+            return False
+        if self.trigger and self.trigger not in str(data.get('trigger', '')).lower():
+            return False
+        if self.conversation and entry_conversation_id(entry) != self.conversation:
+            return False
+        if self.lane and data.get('lane') != self.lane:
+            return False
+        return True
+
+    def match_message(self, record):
+        timestamp = record.get('timestamp', '')
+        if (self.since and timestamp < self.since) or (self.until and timestamp >= self.until):
+            return False
+        if self.conversation and record.get('conversation_id') != self.conversation:
+            return False
+        if self.state and self.state not in record.get('agents_used', []):
+            return False
+        return True
+
+
+def state_keys(entry):
+    """(timestamp, state, conversation) an entry contributes to its block summary"""
+    return entry.get('timestamp', ''), entry.get('data', {}).get('state'), entry_conversation_id(entry)
+
+
+def message_keys(record):
+    """(timestamp, agents, conversation) a message contributes to its block summary"""
+    return record.get('timestamp', ''), record.get('agents_used', []), record.get('conversation_id')
+
+
+class LogIndex:
+    """Sparse block index of one append-only JSONL log (state.jsonl, a segment or messages.jsonl)"""
+
+    def __init__(self, path, keys, header_line=False):
+        self.path = Path(path)
+        self.index_path = self.path.with_name(self.path.name + '.idx.json')
+        self.keys = keys
+        self.decode = json.loads
+        self.data_start = 0
+        if header_line:
+            # Sealed segments: first line is the dictionary, entries are compact
+            dictionary = SegmentDictionary(read_segment_header(self.path))
+            self.decode = lambda line: dictionary.expand(json.loads(line))
+            with open(self.path, 'rb') as f:
+                self.data_start = len(f.readline())
+
+    def _head(self):
+        with open(self.path, 'rb') as f:
+            return hashlib.sha256(f.read(HEAD_BYTES)).hexdigest()
+
+    def load(self):
+        """The index brought up to date with the log, rebuilt when the log was rewritten"""
+        try:
+            index = json.loads(self.index_path.read_text(encoding='utf-8'))
+        except (FileNotFoundError, ValueError):
+            index = None
+        size = self.path.stat().st_size
+        head = self._head()
+        if (index is None or index.get('version') != INDEX_VERSION or index.get('head') != head
+                or index.get('covered', 0) > size):
+            index = {"version": INDEX_VERSION, "head": head, "covered": self.data_start, "blocks": []}
+        if index['covered'] < size:
+            self._extend(index)
+            try:
+                tmp_path = self.index_path.with_name(f"{self.index_path.name}.{os.getpid()}.tmp")
+                tmp_path.write_text(json.dumps(index, ensure_ascii=False), encoding='utf-8')
+                os.replace(tmp_path, self.index_path)
+            except OSError:
+                pass  # read-only session: use the index without persisting it
+        return index
+
+    def _extend(self, index):
+        """Index complete lines past `covered`, reopening a trailing partial block"""
+        blocks = index['blocks']
+        if blocks and blocks[-1]['count'] < BLOCK_ENTRIES:
+            index['covered'] = blocks.pop()['offset']
+        block = None
+        with open(self.path, 'rb') as f:
+            f.seek(index['covered'])
+            offset = index['covered']
+            for raw in f:
+                if not raw.endswith(b'\n'):
+                    break  # line still being written
+                if raw.strip():
+                    timestamp, states, conversation = self.keys(self.decode(raw))
+                    if block is None:
+                        block = {"offset": offset, "count": 0, "min_ts": timestamp, "max_ts": timestamp,
+                                 "states": set(), "conversations": set()}
+                    block['count'] += 1
+                    block['min_ts'] = min(block['min_ts'], timestamp)
+                    block['max_ts'] = max(block['max_ts'], timestamp)
+                    block['states'].update(states if isinstance(states, list) else [states])
+                    if conversation:
+                        block['conversations'].add(conversation)
+                offset += len(raw)
+                if block is not None and block['count'] >= BLOCK_ENTRIES:
+                    blocks.append(self._seal(block, offset))
+                    block = None
+            if block is not None:
+                blocks.append(self._seal(block, offset))
+        index['covered'] = offset
+
+    @staticmethod
+    def _seal(block, end):
+        block['end'] = end
+        block['states'] = sorted(s for s in block['states'] if s)
+        block['conversations'] = sorted(block['conversations'])
+        return block
+
+    def scan(self, filters):
+        """Decoded entries of the blocks that may match (callers apply the exact filter)"""
+        index = self.load()
+        with open(self.path, 'rb') as f:
+            for block in index['blocks']:
+                if not filters.block_may_match(block):
+                    continue
+                f.seek(block['offset'])
+                remaining = block['end'] - block['offset']
+                while remaining > 0:
+                    raw = f.readline()
+                    if not raw:
+                        break
+                    remaining -= len(raw)
+                    if raw.strip():
+                        yield self.decode(raw)
+
+
+def replay_states(session_path, filters=None):
+    """Stream the state entries of a session that match `filters`, oldest first"""
+    filters = filters or Filters()
+    store = open_store(session_path)
+    try:
+        if store.backend == 'sqlite':
+            for entry in sqlite_states(store, filters):
+                if filters.match_state(entry):
+                    yield entry
+            return
+        logs = [LogIndex(segment, state_keys, header_line=True) for segment in store.segment_files()]
+        if store.state_file.exists():
+            logs.append(LogIndex(store.state_file, state_keys))
+        for log in logs:
+            for entry in log.scan(filters):
+                if filters.match_state(entry):
+                    yield entry
+    finally:
+        store.close()
+
+
+def replay_messages(session_path, filters=None):
+    """Stream the conversation records of a session that match `filters`"""
+    filters = filters or Filters()
+    store = open_store(session_path)
+    try:
+        if store.backend == 'sqlite':
+            records = sqlite_messages(store, filters)
+        elif store.messages_file.exists():
+            records = LogIndex(store.messages_file, message_keys).scan(filters)
+        else:
+            records = ()
+        for record in records:
+            if filters.match_message(record):
+                yield record
+    finally:
+        store.close()
+
+
+def sqlite_states(store, filters):
+    """Narrow state rows with the SQLite indexes"""
+    clauses, params = [], []
+    for column, op, value in (("timestamp", ">=", filters.since), ("timestamp", "<", filters.until),
+                              ("state", "=", filters.state), ("conversation_id", "=", filters.conversation)):
+        if value:
+            clauses.append(f"{column} {op} ?")
+            params.append(value)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    for (line,) in store.conn.execute(f"SELECT entry FROM transitions {where} ORDER BY id", params):
+        yield json.loads(line)
+
+
+def sqlite_messages(store, filters):
+    """Narrow conversation rows with the SQLite indexes"""
+    clauses, params = [], []
+    for column, op, value in (("timestamp", ">=", filters.since), ("timestamp", "<", filters.until),
+                              ("conversation_id", "=", filters.conversation)):
+        if value:
+            clauses.append(f"{column} {op} ?")
+            params.append(value)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    for (line,) in store.conn.execute(f"SELECT entry FROM conversations {where} ORDER BY id", params):
+        yield json.loads(line)
+
+
+def state_row(entry):
+    """Flat columns of a state entry"""
+    data = entry.get('data', {})
+    return {
+        "timestamp": entry.get('timestamp'),
+        "type": entry.get('type'),
+        "session": entry.get('session'),
+        "previous_state": data.get('previous_state'),
+        "state": data.get('state'),
+        "trigger": data.get('trigger'),
+        "conversation_id": entry_conversation_id(entry),
+        "lane": data.get('lane'),
+        "workspace": data.get('workspace'),
+    }
+
+
+def message_row(record):
+    """Flat columns of a conversation record"""
+    return {
+        "conversation_id": record.get('conversation_id'),
+        "timestamp": record.get('timestamp'),
+        "summary": record.get('summary'),
+        "files_created": len(record.get('files_created', [])),
+        "agents_used": ";".join(record.get('agents_used', [])),
+    }
+
+
+def write_jsonl(records, out):
+    count = 0
+    for record in records:
+        out.write(json.dumps(record, ensure_ascii=False) + '\n')
+        count += 1
+    return count
+
+
+def write_csv(rows, columns, out):
+    writer = csv.DictWriter(out, fieldnames=columns)
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def write_columns(rows, columns, directory, kind):
+    """One JSONL file per column, written row by row, plus schema.json"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    files = {column: open(directory / f"{column}.jsonl", 'w', encoding='utf-8') for column in columns}
+    count = 0
+    try:
+        for row in rows:
+            for column, f in files.items():
+                f.write(json.dumps(row[column], ensure_ascii=False) + '\n')
+            count += 1
+    finally:
+        for f in files.values():
+            f.close()
+    (directory / 'schema.json').write_text(json.dumps({"kind": kind, "columns": columns, "rows": count}),
+                                           encoding='utf-8')
+    return count
+
+
+def export(session_path, kind='states', filters=None, fmt='jsonl', output=None):
+    """Stream a filtered replay to stdout or `output`; returns the number of rows written"""
+    if kind == 'messages':
+        records, to_row, columns = replay_messages(session_path, filters), message_row, MESSAGE_COLUMNS
+    else:
+        records, to_row, columns = replay_states(session_path, filters), state_row, STATE_COLUMNS
+    if fmt == 'columns':
+        if not output:
+            raise ValueError("--format=columns needs --output=<directory>")
+        return write_columns((to_row(r) for r in records), columns, output, kind)
+
+    out = open(output, 'w', encoding='utf-8', newline='') if output else sys.stdout
+    try:
+        if fmt == 'csv':
+            return write_csv((to_row(r) for r in records), columns, out)
+        return write_jsonl(records, out)
+    finally:
+        if output:
+            out.close()
+
+
+def main(argv=None):
+    """Command line interface"""
+    argv = sys.argv[1:] if argv is None else argv
+    args = [arg for arg in argv if not arg.startswith('--')]
+    options = dict(arg[2:].split('=', 1) for arg in argv if arg.startswith('--') and '=' in arg)
+    kind = args[0] if args else 'states'
+    fmt = options.get('format', 'jsonl')
+    if kind not in ('states', 'messages') or fmt not in ('jsonl', 'csv', 'columns'):
+        print(__doc__.strip())
+        return 1
+
+    session_path = options.get('session') or current_session_path()
+    if not session_path:
+        print(json.dumps({"status": "error", "message": "No active session"}, indent=2))
+        return 1
+    filters = Filters(options.get('since'), options.get('until'), options.get('state'), options.get('trigger'),
+                      options.get('conversation'), options.get('lane'))
+    try:
+        count = export(session_path, kind, filters, fmt, options.get('output'))
+    except ValueError as e:
+        print(json.dumps({"status": "error", "message": str(e)}, indent=2, ensure_ascii=False))
+        return 1
+    if options.get('output'):
+        print(json.dumps({"status": "exported", "kind": kind, "format": fmt, "rows": count,
+                          "output": options['output']}, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
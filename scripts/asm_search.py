@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+ASM Search Module - Incremental full-text index over every session's dialogue.md
+
+The index lives in .asm/search.db (SQLite) next to the sessions it covers. A
+dialogue is re-tokenized only when its size or mtime changed since it was last
+indexed; asm_end_conversation.py refreshes the conversation it ends and every
+query refreshes the rest first. Tokens come from agent_index.tokenize, so mixed
+Chinese/English text is searchable by words, CJK characters and CJK bigrams.
+
+Usage:
+    python3 asm_search.py <query> [--limit=10] [--session=NAME] [--no-refresh]
+"""
+
+import math
+import os
+import sqlite3
+import sys
+from pathlib import Path
+
+from agent_index import B, ENGLISH_STOPWORDS, K1, match_terms, tokenize
+
+SEARCH_DB = 'search.db'
+SEARCH_VERSION = 1
+SNIPPET_WIDTH = 160
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    session TEXT,
+    conversation TEXT,
+    size INTEGER,
+    mtime_ns INTEGER,
+    length INTEGER
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    doc INTEGER NOT NULL,
+    tf INTEGER NOT NULL,
+    PRIMARY KEY (term, doc)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_postings_doc ON postings(doc);
+"""
+
+
+def index_path(asm_dir):
+    """Location of the search index of an .asm directory"""
+    return Path(asm_dir) / SEARCH_DB
+
+
+def connect(asm_dir):
+    """Open (and create or reset) the search index of an .asm directory"""
+    conn = sqlite3.connect(index_path(asm_dir), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+    if row is None or row[0] != str(SEARCH_VERSION):
+        # Tokenization changed: start over
+        with conn:
+            conn.execute("DELETE FROM postings")
+            conn.execute("DELETE FROM docs")
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (str(SEARCH_VERSION),))
+    return conn
+
+
+def dialogue_files(asm_dir):
+    """Yield (path, stat) of every .asm/<session>/conversations/conv_*/dialogue.md"""
+    # Documents are keyed by absolute path
+    for session in os.scandir(os.path.abspath(asm_dir)):
+        if not session.is_dir(follow_symlinks=False):
+            continue
+        conv_dir = Path(session.path) / 'conversations'
+        try:
+            entries = os.scandir(conv_dir)
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        with entries:
+            for conv in entries:
+                if not conv.name.startswith('conv_'):
+                    continue
+                path = Path(conv.path) / 'dialogue.md'
+                try:
+                    yield path, path.stat()
+                except FileNotFoundError:
+                    continue
+
+
+def term_counts(text):
+    """Term frequencies of a dialogue"""
+    counts = {}
+    for token in tokenize(text, ENGLISH_STOPWORDS):
+        counts[token] = counts.get(token, 0) + 1
+    return counts
+
+
+def index_file(conn, path, st=None):
+    """(Re)index one dialogue unless its size and mtime are unchanged; returns True when indexed"""
+    path = Path(path)
+    try:
+        st = st or path.stat()
+    except FileNotFoundError:
+        return False
+    row = conn.execute("SELECT id, size, mtime_ns FROM docs WHERE path = ?", (str(path),)).fetchone()
+    if row and row[1] == st.st_size and row[2] == st.st_mtime_ns:
+        return False
+    try:
+        text = path.read_text(encoding='utf-8', errors='replace')
+    except FileNotFoundError:
+        return False
+    counts = term_counts(text)
+    # One upsert transaction, so a concurrent refresh of the same dialogue waits instead of colliding
+    with conn:
+        conn.execute(
+            "INSERT INTO docs (path, session, conversation, size, mtime_ns, length) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(path) DO UPDATE SET size = excluded.size, mtime_ns = excluded.mtime_ns, "
+            "length = excluded.length",
+            (str(path), path.parent.parent.parent.name, path.parent.name, st.st_size, st.st_mtime_ns,
+             sum(counts.values())))
+        doc = conn.execute("SELECT id FROM docs WHERE path = ?", (str(path),)).fetchone()[0]
+        conn.execute("DELETE FROM postings WHERE doc = ?", (doc,))
+        conn.executemany("INSERT INTO postings (term, doc, tf) VALUES (?, ?, ?)",
+                         [(term, doc, tf) for term, tf in counts.items()])
+    return True
+
+
+def refresh(conn, asm_dir):
+    """Bring the index up to date with every dialogue under asm_dir
+
+    Returns (indexed, removed) counts.
+    """
+    known = {path: (doc_id, size, mtime_ns)
+             for doc_id, path, size, mtime_ns in conn.execute("SELECT id, path, size, mtime_ns FROM docs")}
+    indexed = 0
+    for path, st in dialogue_files(asm_dir):
+        doc = known.pop(str(path), None)
+        if doc and doc[1] == st.st_size and doc[2] == st.st_mtime_ns:
+            continue
+        indexed += index_file(conn, path, st)
+    # Archived dialogues keep their postings; their text is read from the archive
+    stale = [(doc[0],) for path, doc in known.items() if not archived(path)]
+    if stale:
+        with conn:
+            conn.executemany("DELETE FROM postings WHERE doc = ?", stale)
+            conn.executemany("DELETE FROM docs WHERE id = ?", stale)
+    return indexed, len(stale)
+
+
+def archived(dialogue_path):
+    """Whether an indexed dialogue now lives in its conversation's archive"""
+    from asm_archive import locate
+    located = locate(dialogue_path)
+    return located is not None and located[0].exists()
+
+
+def index_conversation(dialogue_path):
+    """Index one conversation's dialogue into the index of its .asm directory"""
+    asm_dir = Path(dialogue_path).parent.parent.parent.parent
+    conn = connect(asm_dir)
+    try:
+        return index_file(conn, dialogue_path)
+    finally:
+        conn.close()
+
+
+def snippet(path, query):
+    """The dialogue line with the most query hits, trimmed around the first hit"""
+    # Whole-token matches in any inflection: "caching" finds "cache", "data" does not find "database"
+    terms = set(tokenize(query, ENGLISH_STOPWORDS))
+    best, best_hits, best_first = "", 0, 0
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            lines = f.readlines()
+    except FileNotFoundError:
+        from asm_archive import read_file
+        try:
+            lines = read_file(path).decode('utf-8', errors='replace').splitlines()
+        except FileNotFoundError:
+            return ""
+    for line in lines:
+        matched, first = match_terms(line.strip(), terms, ENGLISH_STOPWORDS)
+        if len(matched) > best_hits:
+            best, best_hits, best_first = line.strip(), len(matched), first
+    if len(best) <= SNIPPET_WIDTH:
+        return best
+    start = max(0, best_first - SNIPPET_WIDTH // 3)
+    return ("…" if start else "") + best[start:start + SNIPPET_WIDTH] + "…"
+
+
+def search(conn, query, limit=10, session=None):
+    """Rank dialogues against a query with BM25; returns [{path, session, conversation, score, snippet}]"""
+    doc_count, total_length = conn.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM docs").fetchone()
+    if not doc_count:
+        return []
+    avg_length = total_length / doc_count or 1
+    scores = {}
+    for term in set(tokenize(query, ENGLISH_STOPWORDS)):
+        postings = conn.execute(
+            "SELECT p.doc, p.tf, d.length FROM postings p JOIN docs d ON d.id = p.doc WHERE p.term = ?"
+            + (" AND d.session = ?" if session else ""),
+            (term, session) if session else (term,)).fetchall()
+        if not postings:
+            continue
+        idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+        for doc, tf, length in postings:
+            norm = K1 * (1 - B + B * length / avg_length)
+            scores[doc] = scores.get(doc, 0.0) + idf * tf * (K1 + 1) / (tf + norm)
+    ranked = sorted(scores.items(), key=lambda item: -item[1])[:limit]
+    results = []
+    for doc, score in ranked:
+        path, doc_session, conversation = conn.execute(
+            "SELECT path, session, conversation FROM docs WHERE id = ?", (doc,)).fetchone()
+        results.append({"path": path, "session": doc_session, "conversation": conversation,
+                        "score": round(score, 3), "snippet": snippet(path, query)})
+    return results
+
+
+def run_search(query, cwd=None, limit=10, session=None, refresh_index=True):
+    """Refresh the index of cwd/.asm and search it"""
+    asm_dir = Path(cwd or os.getcwd()) / '.asm'
+    if not asm_dir.is_dir():
+        return {"status": "error", "message": f"No .asm directory in {asm_dir.parent}"}
+    conn = connect(asm_dir)
+    try:
+        indexed = removed = 0
+        if refresh_index:
+            indexed, removed = refresh(conn, asm_dir)
+        return {"query": query, "indexed": indexed, "removed": removed,
+                "results": search(conn, query, limit, session)}
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    """Command line interface"""
+    from asm_core import output_json
+
+    argv = sys.argv[1:] if argv is None else argv
+    words = [arg for arg in argv if not arg.startswith('--')]
+    options = dict(arg[2:].split('=', 1) for arg in argv if arg.startswith('--') and '=' in arg)
+    if not words:
+        print(__doc__.strip())
+        return 1
+    result = run_search(" ".join(words), limit=int(options.get('limit', 10)), session=options.get('session'),
+                        refresh_index='--no-refresh' not in argv)
+    output_json(result)
+    return 1 if result.get("status") == "error" else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,764 @@
+#!/usr/bin/env python3
+"""
+ASM Store Module - Pluggable storage backends for session state and conversation records
+
+Two backends share one interface:
+- JsonlStore: state.jsonl + conversations/messages.jsonl (default)
+- SqliteStore: session.db in WAL mode with indexed transitions, conversations, files and agents tables
+
+A session uses SQLite when session.db exists in its directory. dialogue.md files
+are edited directly by the LLM and always stay on disk.
+
+JSONL sessions can be compacted: `asm compact` seals the current state.jsonl into
+state.segments/seg_NNNNNN.jsonl, where every permission profile and session path is
+written once in a header record and referenced by index in the entries that follow
+(object keys too: entries are stored as value arrays against interned key lists).
+Readers expand sealed segments back to the regular entry shape.
+
+Usage:
+    python3 asm_store.py import [session_path]     # JSONL -> SQLite
+    python3 asm_store.py export [session_path]     # SQLite -> JSONL
+    python3 asm_store.py query [--state=X] [--since=ISO] [--until=ISO] [--session=PATH]
+    python3 asm_store.py compact [session_path]    # seal state.jsonl into a compact segment
+"""
+
+import fcntl
+import json
+import os
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+DB_FILE = 'session.db'
+LOCK_FILE = 'state.lock'
+BACKENDS = ('jsonl', 'sqlite')
+
+SEGMENTS_DIR = 'state.segments'
+SEGMENT_PREFIX = 'seg_'
+SEGMENT_VERSION = 1
+
+# Durability policies for batched message writers:
+# none = leave flushing to the OS, batch = fsync once per group commit, record = fsync every record
+DURABILITY = ('none', 'batch', 'record')
+
+
+def write_atomic(path, text):
+    """Replace a small file atomically"""
+    tmp_path = Path(path).with_name(f"{Path(path).name}.{os.getpid()}.tmp")
+    tmp_path.write_text(text, encoding='utf-8')
+    os.replace(tmp_path, path)
+
+
+@contextmanager
+def session_lock(session_path):
+    """Hold the session's exclusive state lock (state.lock) for read-modify-append sequences"""
+    fd = os.open(Path(session_path) / LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)  # releases the lock
+
+
+def state_head_file(state_file):
+    """Checkpoint file holding the last entry of a state log"""
+    return Path(state_file).with_name('state.head.json')
+
+
+def tail_line(path, block_size=4096):
+    """Return the last non-empty line of a file by seeking backwards from the end"""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        buffer = b''
+        while position > 0:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            buffer = f.read(step) + buffer
+            stripped = buffer.rstrip(b'\n')
+            newline = stripped.rfind(b'\n')
+            if newline != -1:
+                return stripped[newline + 1:].decode('utf-8')
+        return buffer.rstrip(b'\n').decode('utf-8')
+
+
+def write_state_head(state_file, entry):
+    """Atomically checkpoint the last entry together with the log size it belongs to"""
+    head = {"size": Path(state_file).stat().st_size, "entry": entry}
+    write_atomic(state_head_file(state_file), json.dumps(head, ensure_ascii=False))
+
+
+def read_last_state(state_file):
+    """Return the last entry of state.jsonl
+
+    Uses the head checkpoint when it matches the current log size, otherwise
+    reads only the tail of the log.
+    """
+    try:
+        head = json.loads(state_head_file(state_file).read_text(encoding='utf-8'))
+        if head.get("size") == Path(state_file).stat().st_size:
+            return head["entry"]
+    except (FileNotFoundError, ValueError, KeyError):
+        pass
+    return json.loads(tail_line(state_file))
+
+
+def write_state(state_file, entry, mode='a'):
+    """Write one entry to state.jsonl and refresh the head checkpoint"""
+    with open(state_file, mode, encoding='utf-8') as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+    write_state_head(state_file, entry)
+
+
+def append_state(state_file, entry):
+    """Append one entry to state.jsonl"""
+    write_state(state_file, entry, 'a')
+
+
+def iter_jsonl(path, offset=0):
+    """Yield (line, entry) for each non-empty line of a JSONL file, starting at a byte offset"""
+    with open(path, 'r', encoding='utf-8') as f:
+        if offset:
+            f.seek(offset)
+        for line in f:
+            line = line.rstrip('\n')
+            if line.strip():
+                yield line, json.loads(line)
+
+
+def entry_conversation_id(entry):
+    """Conversation a state entry belongs to, derived from its dialogue path"""
+    dialogue_path = entry.get('data', {}).get('dialogue_path')
+    return Path(dialogue_path).parent.name if dialogue_path else None
+
+
+class SegmentDictionary:
+    """Values written once in a segment header and referenced by index from its entries
+
+    - shapes: key lists of objects, so entries are stored as [shape, value, ...]
+    - profiles: permission dicts, referenced as {"$p": index}
+    - prefixes: conversation/session directories, referenced as {"$s": index, "r": rest}
+    """
+
+    def __init__(self, header=None):
+        header = header or {}
+        self.shapes = [tuple(keys) for keys in header.get('shapes', [])]
+        self.profiles = header.get('profiles', [])
+        self.prefixes = header.get('prefixes', [])
+        self._shape_ids = {keys: i for i, keys in enumerate(self.shapes)}
+        self._profile_ids = {json.dumps(p, ensure_ascii=False): i for i, p in enumerate(self.profiles)}
+        self._prefix_ids = {prefix: i for i, prefix in enumerate(self.prefixes)}
+
+    @staticmethod
+    def _intern(value, key, ids, values):
+        if key not in ids:
+            ids[key] = len(values)
+            values.append(value)
+        return ids[key]
+
+    def header(self):
+        return {"shapes": [list(keys) for keys in self.shapes], "profiles": self.profiles, "prefixes": self.prefixes}
+
+    def compact(self, entry):
+        """Encode a state entry against this dictionary, extending it as needed"""
+        # Paths are interned against the conversation directory when there is one,
+        # otherwise against the session directory
+        candidates = []
+        data = entry.get('data')
+        dialogue_path = data.get('dialogue_path') if isinstance(data, dict) else None
+        if isinstance(dialogue_path, str) and dialogue_path:
+            candidates.append(os.path.dirname(dialogue_path))
+        session_path = entry.get('session_path')
+        if isinstance(session_path, str) and session_path:
+            candidates.append(session_path)
+
+        def encode(value, key=None):
+            if isinstance(value, dict):
+                if key == 'permissions':
+                    profile = json.dumps(value, ensure_ascii=False)
+                    return {"$p": self._intern(value, profile, self._profile_ids, self.profiles)}
+                keys = tuple(value)
+                shape = self._intern(keys, keys, self._shape_ids, self.shapes)
+                return [shape] + [encode(v, k) for k, v in value.items()]
+            if isinstance(value, list):
+                return {"$l": [encode(v) for v in value]}
+            if isinstance(value, str):
+                for prefix in candidates:
+                    if value == prefix or value.startswith(prefix + '/'):
+                        index = self._intern(prefix, prefix, self._prefix_ids, self.prefixes)
+                        return {"$s": index, "r": value[len(prefix):]}
+            return value
+
+        return encode(entry)
+
+    def expand(self, compact):
+        """Decode an entry written by compact()"""
+        if isinstance(compact, list):
+            keys = self.shapes[compact[0]]
+            return {key: self.expand(value) for key, value in zip(keys, compact[1:])}
+        if isinstance(compact, dict):
+            if "$p" in compact:
+                return self.profiles[compact["$p"]]
+            if "$s" in compact:
+                return self.prefixes[compact["$s"]] + compact["r"]
+            return [self.expand(value) for value in compact["$l"]]
+        return compact
+
+
+def read_segment_header(path):
+    """Header record of a sealed segment"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.loads(f.readline())
+
+
+def iter_segment(path):
+    """Yield the expanded entries of a sealed segment"""
+    with open(path, 'r', encoding='utf-8') as f:
+        dictionary = SegmentDictionary(json.loads(f.readline()))
+        for line in f:
+            if line.strip():
+                yield dictionary.expand(json.loads(line))
+
+
+def last_segment_entry(path):
+    """Expanded last entry of a sealed segment, without reading its body"""
+    header = read_segment_header(path)
+    if not header.get('entries'):
+        return {}
+    return SegmentDictionary(header).expand(json.loads(tail_line(path)))
+
+
+class JsonlStore:
+    """state.jsonl + conversations/messages.jsonl"""
+
+    backend = 'jsonl'
+
+    def __init__(self, session_path):
+        self.session_path = Path(session_path)
+        self.state_file = self.session_path / 'state.jsonl'
+        self.messages_file = self.session_path / 'conversations' / 'messages.jsonl'
+        self.segments_dir = self.session_path / SEGMENTS_DIR
+
+    def segment_files(self):
+        """Sealed state segments, oldest first"""
+        if not self.segments_dir.exists():
+            return []
+        # Ordered by number; segments sealed before the seg_ prefix are named NNNNNN.jsonl
+        return sorted(self.segments_dir.glob('*.jsonl'), key=lambda path: int(path.stem.rpartition('_')[2]))
+
+    def generation(self):
+        """Number of sealed segments; positions are only comparable within one generation"""
+        return len(self.segment_files())
+
+    def create(self):
+        """Create empty storage for a new session"""
+        self.messages_file.parent.mkdir(parents=True, exist_ok=True)
+        self.messages_file.touch()
+
+    def exists(self):
+        return self.state_file.exists() or bool(self.segment_files())
+
+    def stamp(self):
+        """(size, mtime) of the state log, used to validate in-memory caches"""
+        try:
+            st = self.state_file.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_size, st.st_mtime_ns)
+
+    def reset_state(self, entry):
+        """Start the state log over with a single entry"""
+        write_state(self.state_file, entry, 'w')
+
+    def append_state(self, entry):
+        append_state(self.state_file, entry)
+
+    def last_state(self):
+        live_size = self.state_file.stat().st_size if self.state_file.exists() else 0
+        if live_size or state_head_file(self.state_file).exists():
+            return read_last_state(self.state_file)
+        # Everything has been sealed: the last entry is at the end of the newest segment
+        segments = self.segment_files()
+        return last_segment_entry(segments[-1]) if segments else {}
+
+    def position(self):
+        """Byte offset in state.jsonl where the next state entry will be written"""
+        try:
+            return self.state_file.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def iter_states(self, start=0):
+        """Stream state entries written at or after position `start`
+
+        Position 0 means the whole history, sealed segments included.
+        """
+        if not start:
+            for segment in self.segment_files():
+                yield from iter_segment(segment)
+        if self.state_file.exists():
+            for _, entry in iter_jsonl(self.state_file, start):
+                yield entry
+
+    def iter_state_lines(self):
+        """Yield (line, entry) over the whole history; sealed entries are re-serialized"""
+        for segment in self.segment_files():
+            for entry in iter_segment(segment):
+                yield json.dumps(entry, ensure_ascii=False), entry
+        if self.state_file.exists():
+            yield from iter_jsonl(self.state_file)
+
+    def append_message(self, record):
+        with open(self.messages_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def iter_messages(self):
+        if self.messages_file.exists():
+            for _, record in iter_jsonl(self.messages_file):
+                yield record
+
+    def message_writer(self, durability='batch', batch_size=1000):
+        return JsonlMessageWriter(self.messages_file, durability, batch_size)
+
+    def transitions(self, state=None, since=None, until=None):
+        """Transitions matching the filters (full scan of the log)"""
+        for entry in self.iter_states():
+            if entry.get('type') != 'transition':
+                continue
+            if state and entry.get('data', {}).get('state') != state:
+                continue
+            timestamp = entry.get('timestamp', '')
+            if (since and timestamp < since) or (until and timestamp >= until):
+                continue
+            yield entry
+
+    def close(self):
+        pass
+
+
+class MessageWriter:
+    """Buffers conversation records and appends them in group commits
+
+    Use as a context manager; closing commits whatever is still buffered.
+    """
+
+    def __init__(self, durability, batch_size):
+        if durability not in DURABILITY:
+            raise ValueError(f"Unknown durability: {durability} (expected one of {', '.join(DURABILITY)})")
+        self.durability = durability
+        # fsync-per-record means every record is its own commit
+        self.batch_size = 1 if durability == 'record' else max(1, batch_size)
+        self.pending = []
+        self.records = 0
+        self.commits = 0
+
+    def write(self, record):
+        self.pending.append(record)
+        if len(self.pending) >= self.batch_size:
+            self.commit()
+
+    def commit(self):
+        if not self.pending:
+            return
+        self._commit(self.pending)
+        self.records += len(self.pending)
+        self.commits += 1
+        self.pending = []
+
+    def close(self):
+        self.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class JsonlMessageWriter(MessageWriter):
+    """Group-commit appender holding a single messages.jsonl handle"""
+
+    def __init__(self, messages_file, durability, batch_size):
+        super().__init__(durability, batch_size)
+        Path(messages_file).parent.mkdir(parents=True, exist_ok=True)
+        self.file = open(messages_file, 'a', encoding='utf-8')
+
+    def _commit(self, records):
+        self.file.write(''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records))
+        self.file.flush()
+        if self.durability != 'none':
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        super().close()
+        self.file.close()
+
+
+class SqliteMessageWriter(MessageWriter):
+    """Group-commit appender inserting one transaction per batch"""
+
+    def __init__(self, store, durability, batch_size):
+        super().__init__(durability, batch_size)
+        self.store = store
+        self.store.conn.execute(f"PRAGMA synchronous={'OFF' if durability == 'none' else 'FULL'}")
+
+    def _commit(self, records):
+        with self.store.conn:
+            for record in records:
+                self.store._insert_message(record)
+
+    def close(self):
+        super().close()
+        self.store.conn.execute("PRAGMA synchronous=NORMAL")
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transitions (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT,
+    type TEXT,
+    session TEXT,
+    previous_state TEXT,
+    state TEXT,
+    trigger TEXT,
+    conversation_id TEXT,
+    entry TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_transitions_state_time ON transitions(state, timestamp);
+CREATE INDEX IF NOT EXISTS idx_transitions_time ON transitions(timestamp);
+CREATE INDEX IF NOT EXISTS idx_transitions_conversation ON transitions(conversation_id);
+
+CREATE TABLE IF NOT EXISTS conversations (
+    id INTEGER PRIMARY KEY,
+    conversation_id TEXT,
+    timestamp TEXT,
+    summary TEXT,
+    entry TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_conversations_id ON conversations(conversation_id);
+CREATE INDEX IF NOT EXISTS idx_conversations_time ON conversations(timestamp);
+
+CREATE TABLE IF NOT EXISTS files (
+    conversation_row INTEGER NOT NULL REFERENCES conversations(id),
+    conversation_id TEXT,
+    path TEXT,
+    summary TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_files_path ON files(path);
+CREATE INDEX IF NOT EXISTS idx_files_conversation ON files(conversation_id);
+
+CREATE TABLE IF NOT EXISTS agents (
+    conversation_row INTEGER NOT NULL REFERENCES conversations(id),
+    conversation_id TEXT,
+    agent TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_agents_agent ON agents(agent);
+"""
+
+
+class SqliteStore:
+    """session.db with indexed tables; the original JSON of every record is kept for lossless export"""
+
+    backend = 'sqlite'
+
+    def __init__(self, session_path):
+        self.session_path = Path(session_path)
+        self.db_file = self.session_path / DB_FILE
+        self._conn = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            # Only SQLite sessions pay for the sqlite3 import
+            import sqlite3
+            # The daemon caches stores across request threads and serializes requests itself
+            self._conn = sqlite3.connect(self.db_file, timeout=30, isolation_level=None, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def create(self):
+        """Create empty storage for a new session"""
+        self.session_path.mkdir(parents=True, exist_ok=True)
+        self.conn
+
+    def exists(self):
+        return self.db_file.exists()
+
+    def stamp(self):
+        # Row lookups are indexed, so there is nothing worth caching
+        return None
+
+    def _insert_state(self, entry, line=None):
+        data = entry.get('data', {})
+        self.conn.execute(
+            "INSERT INTO transitions (timestamp, type, session, previous_state, state, trigger, conversation_id, entry)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (entry.get('timestamp'), entry.get('type'), entry.get('session'), data.get('previous_state'),
+             data.get('state'), data.get('trigger'), entry_conversation_id(entry),
+             line if line is not None else json.dumps(entry, ensure_ascii=False)))
+
+    def _insert_message(self, record, line=None):
+        cursor = self.conn.execute(
+            "INSERT INTO conversations (conversation_id, timestamp, summary, entry) VALUES (?, ?, ?, ?)",
+            (record.get('conversation_id'), record.get('timestamp'), record.get('summary'),
+             line if line is not None else json.dumps(record, ensure_ascii=False)))
+        row = cursor.lastrowid
+        conv_id = record.get('conversation_id')
+        self.conn.executemany(
+            "INSERT INTO files (conversation_row, conversation_id, path, summary) VALUES (?, ?, ?, ?)",
+            [(row, conv_id, f.get('path'), f.get('summary')) for f in record.get('files_created', [])
+             if isinstance(f, dict)])
+        agents = record.get('agents_used', [])
+        self.conn.executemany(
+            "INSERT INTO agents (conversation_row, conversation_id, agent) VALUES (?, ?, ?)",
+            [(row, conv_id, agent if isinstance(agent, str) else agent.get('agent')) for agent in agents])
+
+    def reset_state(self, entry):
+        with self.conn:
+            self.conn.execute("DELETE FROM transitions")
+            self._insert_state(entry)
+
+    def append_state(self, entry):
+        self._insert_state(entry)
+
+    def last_state(self):
+        row = self.conn.execute("SELECT entry FROM transitions ORDER BY id DESC LIMIT 1").fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def generation(self):
+        return 0
+
+    def position(self):
+        """Row id after which the next state entry will be written"""
+        return self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM transitions").fetchone()[0]
+
+    def iter_states(self, start=0):
+        """Stream state entries written after position `start`"""
+        for (line,) in self.conn.execute("SELECT entry FROM transitions WHERE id > ? ORDER BY id", (start,)):
+            yield json.loads(line)
+
+    def append_message(self, record):
+        with self.conn:
+            self._insert_message(record)
+
+    def iter_messages(self):
+        for (line,) in self.conn.execute("SELECT entry FROM conversations ORDER BY id"):
+            yield json.loads(line)
+
+    def message_writer(self, durability='batch', batch_size=1000):
+        return SqliteMessageWriter(self, durability, batch_size)
+
+    def transitions(self, state=None, since=None, until=None):
+        """Transitions matching the filters, answered from the indexes"""
+        clauses, params = ["type = 'transition'"], []
+        if state:
+            clauses.append("state = ?")
+            params.append(state)
+        if since:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until:
+            clauses.append("timestamp < ?")
+            params.append(until)
+        sql = f"SELECT entry FROM transitions WHERE {' AND '.join(clauses)} ORDER BY id"
+        for (line,) in self.conn.execute(sql, params):
+            yield json.loads(line)
+
+    def import_jsonl(self, jsonl_store):
+        """Load a JSONL session, keeping every line's exact text"""
+        with self.conn:
+            for line, entry in jsonl_store.iter_state_lines():
+                self._insert_state(entry, line)
+            if jsonl_store.messages_file.exists():
+                for line, record in iter_jsonl(jsonl_store.messages_file):
+                    self._insert_message(record, line)
+
+    def export_jsonl(self, state_file, messages_file):
+        """Write the session back out in the JSONL format, line for line"""
+        with open(state_file, 'w', encoding='utf-8') as f:
+            for (line,) in self.conn.execute("SELECT entry FROM transitions ORDER BY id"):
+                f.write(line + '\n')
+        Path(messages_file).parent.mkdir(parents=True, exist_ok=True)
+        with open(messages_file, 'w', encoding='utf-8') as f:
+            for (line,) in self.conn.execute("SELECT entry FROM conversations ORDER BY id"):
+                f.write(line + '\n')
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def open_store(session_path, backend=None):
+    """Open the store of a session; backend defaults to whatever the session already uses"""
+    if backend is None:
+        backend = 'sqlite' if (Path(session_path) / DB_FILE).exists() else 'jsonl'
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown store backend: {backend} (expected one of {', '.join(BACKENDS)})")
+    return SqliteStore(session_path) if backend == 'sqlite' else JsonlStore(session_path)
+
+
+def current_session_path():
+    """Session path from .asm/.current_asm_session in the working directory"""
+    session_file = Path.cwd() / '.asm' / '.current_asm_session'
+    return session_file.read_text().strip() if session_file.exists() else None
+
+
+def migrate_to_sqlite(session_path):
+    """Import a JSONL session into session.db; the JSONL files are kept as *.migrated"""
+    jsonl_store = JsonlStore(session_path)
+    store = SqliteStore(session_path)
+    if store.exists():
+        raise ValueError(f"{store.db_file} already exists")
+    store.import_jsonl(jsonl_store)
+    counts = store.conn.execute(
+        "SELECT (SELECT COUNT(*) FROM transitions), (SELECT COUNT(*) FROM conversations)").fetchone()
+    store.close()
+    for path in (jsonl_store.state_file, jsonl_store.messages_file, state_head_file(jsonl_store.state_file),
+                 jsonl_store.segments_dir):
+        if path.exists():
+            os.replace(path, path.with_name(path.name + '.migrated'))
+    return {"status": "imported", "database": str(store.db_file), "transitions": counts[0], "conversations": counts[1]}
+
+
+def migrate_to_jsonl(session_path):
+    """Export session.db back to JSONL; the database is kept as session.db.migrated"""
+    store = SqliteStore(session_path)
+    if not store.exists():
+        raise ValueError(f"{store.db_file} not found")
+    jsonl_store = JsonlStore(session_path)
+    store.export_jsonl(jsonl_store.state_file, jsonl_store.messages_file)
+    last_state = store.last_state()
+    store.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    store.close()
+    if last_state:
+        write_state_head(jsonl_store.state_file, last_state)
+    os.replace(store.db_file, store.db_file.with_name(DB_FILE + '.migrated'))
+    for suffix in ('-wal', '-shm'):
+        leftover = store.db_file.with_name(DB_FILE + suffix)
+        if leftover.exists():
+            leftover.unlink()
+    return {"status": "exported", "state_file": str(jsonl_store.state_file), "messages_file": str(jsonl_store.messages_file)}
+
+
+def compact_session(session_path):
+    """Seal the current state.jsonl into a compact segment and start an empty live log
+
+    Entries appended while the segment is being written are carried over to the
+    new live log.
+    """
+    store = open_store(session_path)
+    if store.backend != 'jsonl':
+        raise ValueError("Only JSONL sessions can be compacted (SQLite rows are already indexed)")
+    state_file = store.state_file
+    snapshot_size = state_file.stat().st_size if state_file.exists() else 0
+    if not snapshot_size:
+        return {"status": "nothing_to_compact", "session_path": str(session_path)}
+
+    def snapshot_lines():
+        with open(state_file, 'rb') as f:
+            remaining = snapshot_size
+            for raw in f:
+                if remaining <= 0:
+                    break
+                remaining -= len(raw)
+                if raw.strip():
+                    yield raw.decode('utf-8')
+
+    # First pass builds the dictionary, second pass writes the referencing entries
+    dictionary = SegmentDictionary()
+    entries = 0
+    first_timestamp = last_timestamp = None
+    last_entry = None
+    for line in snapshot_lines():
+        last_entry = json.loads(line)
+        dictionary.compact(last_entry)
+        entries += 1
+        first_timestamp = first_timestamp or last_entry.get('timestamp')
+        last_timestamp = last_entry.get('timestamp')
+
+    store.segments_dir.mkdir(exist_ok=True)
+    segment = store.segments_dir / f"{SEGMENT_PREFIX}{store.generation() + 1:06d}.jsonl"
+    tmp_segment = segment.with_name(segment.name + '.tmp')
+    header = {
+        "type": "segment_header",
+        "version": SEGMENT_VERSION,
+        "entries": entries,
+        "first_timestamp": first_timestamp,
+        "last_timestamp": last_timestamp,
+        **dictionary.header()
+    }
+    with open(tmp_segment, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(header, ensure_ascii=False) + '\n')
+        for line in snapshot_lines():
+            compact = dictionary.compact(json.loads(line))
+            f.write(json.dumps(compact, ensure_ascii=False, separators=(',', ':')) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.chmod(tmp_segment, 0o444)
+    os.replace(tmp_segment, segment)
+
+    # Carry over anything appended since the snapshot and restart the live log;
+    # appends wait on the session lock meanwhile so none land in the old file
+    with session_lock(session_path):
+        with open(state_file, 'rb') as f:
+            f.seek(snapshot_size)
+            carried = f.read()
+        tmp_live = state_file.with_name(state_file.name + '.compact.tmp')
+        tmp_live.write_bytes(carried)
+        os.replace(tmp_live, state_file)
+        if carried.strip():
+            last_entry = json.loads(tail_line(state_file))
+        write_state_head(state_file, last_entry)
+
+    segment_size = segment.stat().st_size
+    return {
+        "status": "compacted",
+        "segment": str(segment),
+        "entries": entries,
+        "original_bytes": snapshot_size,
+        "segment_bytes": segment_size,
+        "ratio": round(snapshot_size / segment_size, 2),
+        "profiles": len(dictionary.profiles),
+        "prefixes": len(dictionary.prefixes)
+    }
+
+
+def main():
+    """Command line interface"""
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    options = dict(arg[2:].split('=', 1) for arg in sys.argv[1:] if arg.startswith('--') and '=' in arg)
+
+    if not args or args[0] not in ('import', 'export', 'query', 'compact'):
+        print("Usage: asm_store.py import|export|compact [session_path]")
+        print("       asm_store.py query [--state=X] [--since=ISO] [--until=ISO] [--session=PATH]")
+        sys.exit(1)
+
+    action = args[0]
+    session_path = args[1] if len(args) > 1 else options.get('session') or current_session_path()
+    if not session_path:
+        print(json.dumps({"status": "error", "message": "No active session"}, indent=2))
+        sys.exit(1)
+
+    try:
+        if action == 'import':
+            print(json.dumps(migrate_to_sqlite(session_path), indent=2, ensure_ascii=False))
+        elif action == 'export':
+            print(json.dumps(migrate_to_jsonl(session_path), indent=2, ensure_ascii=False))
+        elif action == 'compact':
+            print(json.dumps(compact_session(session_path), indent=2, ensure_ascii=False))
+        else:
+            store = open_store(session_path)
+            for entry in store.transitions(options.get('state'), options.get('since'), options.get('until')):
+                print(json.dumps(entry, ensure_ascii=False))
+            store.close()
+    except ValueError as e:
+        print(json.dumps({"status": "error", "message": str(e)}, indent=2, ensure_ascii=False))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,8 @@ SAM (State Agent Machine) Todo List Generator - Generates todo lists with exampl
 import sys
 from pathlib import Path
 
-SCRIPTS_PATH = Path('/Users/leon_wu/.claude/scripts')
+# Commands point at the scripts beside this file, wherever they are installed
+SCRIPTS_PATH = Path(__file__).resolve().parent
 
 def generate_init_todos():
     """Generate todos for initializing state machine"""
@@ -28,7 +29,7 @@ def generate_conversation_todos():
             "task": "對話資料夾初始化",
             "command": f"python3 {SCRIPTS_PATH}/asm_start_conversation.py",
             "example": f"python3 {SCRIPTS_PATH}/asm_start_conversation.py",
-            "description": "建立新的對話資料夾 (conv_XXX)",
+            "description": "建立新的對話資料夾 (conv_XXXXXX)",
             "returns": "JSON: status, conversation_id, workspace, dialogue_path, message"
         },
         {
@@ -52,7 +53,7 @@ def generate_conversation_todos():
             "command": f"python3 {SCRIPTS_PATH}/asm_end_conversation.py [summary]",
             "example": f"python3 {SCRIPTS_PATH}/asm_end_conversation.py 'Created hello world script and tested it'",
             "description": "記錄 50 字以內的簡短摘要到 messages.jsonl",
-            "returns": "JSON: status, conversation_id, summary, files_created, agents_used, message",
+            "returns": "JSON: status, conversation_id, summary, files_created, agents_used, agent_activity, message",
             "note": "summary 參數應該是簡短摘要（50字內），詳細內容應已記錄在 dialogue.md"
         }
     ]
@@ -105,23 +106,59 @@ def generate_end_session_todos():
     ]
     return todos
 
-def print_todos(todos, title):
-    """Print todos in formatted way"""
-    print(f"\n{title}:")
-    print("=" * 60)
+def format_todos(todos, title):
+    """Format todos as printable text"""
+    lines = [f"\n{title}:", "=" * 60]
 
     for i, todo in enumerate(todos, 1):
-        print(f"\n[{i}] {todo['task']}")
+        lines.append(f"\n[{i}] {todo['task']}")
         if 'command' in todo:
-            print(f"    命令: {todo['command']}")
-            print(f"    範例: {todo['example']}")
-        print(f"    說明: {todo['description']}")
+            lines.append(f"    命令: {todo['command']}")
+            lines.append(f"    範例: {todo['example']}")
+        lines.append(f"    說明: {todo['description']}")
         if 'returns' in todo:
-            print(f"    回傳: {todo['returns']}")
+            lines.append(f"    回傳: {todo['returns']}")
         if 'note' in todo:
-            print(f"    注意: {todo['note']}")
+            lines.append(f"    注意: {todo['note']}")
+
+    lines.append("\n" + "=" * 60)
+    return "\n".join(lines)
 
-    print("\n" + "=" * 60)
+def print_todos(todos, title):
+    """Print todos in formatted way"""
+    print(format_todos(todos, title))
+
+SCENARIOS = {
+    "init": (generate_init_todos, "初始化狀態機 Todo List"),
+    "start_conversation": (generate_conversation_todos, "對話 Todo List"),
+    "transition_to_agent": (generate_transition_to_agent_todos, "委派給 Agent Todo List"),
+    "end_session": (generate_end_session_todos, "結束狀態機 Todo List"),
+}
+
+# `asm.py run` arguments of each scenario; it executes the leading command steps in one call
+RUN_USAGE = {
+    "init": "init [project_name]",
+    "start_conversation": "start_conversation",
+    "transition_to_agent": "transition_to_agent [agent-name] [trigger]",
+    "end_conversation": "end_conversation [summary]",
+    "end_session": "end_session",
+}
+
+def render_scenario(scenario):
+    """Render the todo list of a scenario (or the usage text)"""
+    if scenario in RUN_USAGE:
+        lines = []
+        if scenario in SCENARIOS:
+            generate, title = SCENARIOS[scenario]
+            lines.append(format_todos(generate(), title))
+        return "\n".join(lines + [
+            f"單次呼叫: python3 {SCRIPTS_PATH}/asm.py run {RUN_USAGE[scenario]}",
+            "    說明: 在同一個行程內依序執行開頭的命令步驟並回傳合併的 JSON，next 欄位為其餘的待辦事項"
+        ])
+    return "\n".join([
+        f"Unknown scenario: {scenario}",
+        "Valid scenarios: init, start_conversation, end_conversation, transition_to_agent, end_session"
+    ])
 
 def main():
     """Main entry point"""
@@ -130,27 +167,8 @@ def main():
         print("Scenarios: init, start_conversation, end_conversation, transition_to_agent, end_session")
         return
 
-    scenario = sys.argv[1]
-
-    if scenario == "init":
-        todos = generate_init_todos()
-        print_todos(todos, "初始化狀態機 Todo List")
-
-    elif scenario == "start_conversation":
-        todos = generate_conversation_todos()
-        print_todos(todos, "對話 Todo List")
-
-    elif scenario == "transition_to_agent":
-        todos = generate_transition_to_agent_todos()
-        print_todos(todos, "委派給 Agent Todo List")
-
-    elif scenario == "end_session":
-        todos = generate_end_session_todos()
-        print_todos(todos, "結束狀態機 Todo List")
-
-    else:
-        print(f"Unknown scenario: {scenario}")
-        print("Valid scenarios: init, start_conversation, end_conversation, transition_to_agent, end_session")
+    from asm_core import dispatch
+    dispatch("todo", sys.argv[1:2])
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
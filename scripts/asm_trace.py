@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+ASM Trace Module - Opt-in timing spans for ASM commands
+
+Set ASM_TRACE=1 to append one record per command to <session>/trace.jsonl:
+
+    {"timestamp": ..., "command": "transition", "source": "client", "pid": 123,
+     "total_ms": 4.1, "spans": [{"name": "state_read", "ms": 0.8}, ...]}
+
+When tracing is off, span() and command() hand back a shared no-op context
+manager, so the disabled cost is a global lookup and a branch.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime
+from pathlib import Path
+
+TRACE_FILE = 'trace.jsonl'
+ENABLED = os.environ.get('ASM_TRACE', '') not in ('', '0')
+
+_NULL_SPAN = nullcontext()
+_local = threading.local()
+
+
+class _Span:
+    """Time one phase of the current command"""
+
+    __slots__ = ('trace', 'name', 'start')
+
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.trace.spans.append({"name": self.name, "ms": round((time.perf_counter() - self.start) * 1000, 3)})
+        return False
+
+
+class Trace:
+    """Spans collected for one command"""
+
+    def __init__(self, command, source):
+        self.command = command
+        self.source = source
+        self.spans = []
+        self.session_path = None
+        self.start = time.perf_counter()
+
+    def record(self):
+        """The trace.jsonl line of this command"""
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "command": self.command,
+            "source": self.source,
+            "pid": os.getpid(),
+            "total_ms": round((time.perf_counter() - self.start) * 1000, 3),
+            "spans": self.spans
+        }
+
+
+def span(name):
+    """Context manager timing a phase of the running command (no-op when tracing is off)"""
+    trace = getattr(_local, 'trace', None) if ENABLED else None
+    return _Span(trace, name) if trace is not None else _NULL_SPAN
+
+
+def set_session(session_path, replace=True):
+    """Tell the running command which session its trace belongs to
+
+    With replace=False an already known session is kept.
+    """
+    trace = getattr(_local, 'trace', None) if ENABLED else None
+    if trace is not None and session_path and (replace or trace.session_path is None):
+        trace.session_path = str(session_path)
+
+
+class _Command:
+    """Install a Trace for the duration of a command and write it out on exit
+
+    Nested commands (dispatch falling back to run_command) fold into the
+    outermost trace.
+    """
+
+    __slots__ = ('name', 'source', 'trace')
+
+    def __init__(self, name, source):
+        self.name = name
+        self.source = source
+        self.trace = None
+
+    def __enter__(self):
+        if getattr(_local, 'trace', None) is None:
+            self.trace = _local.trace = Trace(self.name, self.source)
+        return self
+
+    def __exit__(self, *exc):
+        if self.trace is not None:
+            _local.trace = None
+            write_trace(self.trace)
+        return False
+
+
+def command(name, source="client"):
+    """Context manager tracing one command into its session's trace.jsonl (no-op when tracing is off)"""
+    return _Command(name, source) if ENABLED else _NULL_SPAN
+
+
+def write_trace(trace):
+    """Append a finished trace to its session (dropped when no session is known)"""
+    if not trace.session_path or not Path(trace.session_path).is_dir():
+        return
+    line = json.dumps(trace.record(), ensure_ascii=False) + "\n"
+    # A single O_APPEND write keeps concurrent records from interleaving
+    fd = os.open(Path(trace.session_path) / TRACE_FILE, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line.encode('utf-8'))
+    finally:
+        os.close(fd)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def load_traces(session_path, command_filter=None):
+    """Yield trace records of a session, optionally for one command"""
+    try:
+        f = open(Path(session_path) / TRACE_FILE, 'r', encoding='utf-8')
+    except FileNotFoundError:
+        return
+    with f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if command_filter is None or record.get("command") == command_filter:
+                yield record
+
+
+def stats(session_path, command_filter=None):
+    """p50/p95/p99 of the total and of every phase, per command and source"""
+    totals = {}
+    phases = {}
+    for record in load_traces(session_path, command_filter):
+        key = record["command"] if record.get("source", "client") == "client" else f"{record['command']} ({record['source']})"
+        totals.setdefault(key, []).append(record["total_ms"])
+        command_phases = phases.setdefault(key, {})
+        for item in record.get("spans", []):
+            command_phases.setdefault(item["name"], []).append(item["ms"])
+
+    def summary(values):
+        values.sort()
+        return {
+            "count": len(values),
+            "p50_ms": percentile(values, 50),
+            "p95_ms": percentile(values, 95),
+            "p99_ms": percentile(values, 99),
+            "max_ms": values[-1]
+        }
+
+    return {
+        key: {"total": summary(totals[key]),
+              "phases": {name: summary(values) for name, values in phases[key].items()}}
+        for key in sorted(totals)
+    }
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+ASM Workflow Module - Compile workflow/*.md into agent-step DAGs and schedule them
+
+A workflow file is read as a set of pipelines:
+- A `##` section whose `###` headings are numbered ("### 1. Design", "### Phase 2: ...")
+  is a staged pipeline: every step of a stage depends on every step of the stage before.
+- Any other `###` heading holding agent steps is a pipeline of its own.
+- Inside a heading, numbered items ("1. **agent**: task") run in sequence, while
+  bullets ("- **agent**: task") and bare "**agent**: task" paragraphs run in parallel.
+
+Compiled workflows are cached in ~/.claude/data/workflow-dags.json keyed by the
+file's SHA-256, so unchanged files are never re-parsed.
+
+Usage:
+    python3 asm_workflow.py list
+    python3 asm_workflow.py show <workflow>[/<pipeline>]
+    python3 asm_workflow.py ready <workflow>/<pipeline> [--done=s1,s2]
+    python3 asm_workflow.py run <workflow>/<pipeline> --exec='<command with {agent} {task} {step}>' [--workers=N]
+"""
+
+import hashlib
+import json
+import os
+import re
+import shlex
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+# Bump when the compiled shape changes so stale cache entries are discarded
+COMPILER_VERSION = 1
+
+SECTION_RE = re.compile(r'^##\s+(.+?)\s*$')
+HEADING_RE = re.compile(r'^###\s+(.+?)\s*$')
+NUMBERED_HEADING_RE = re.compile(r'^(?:(?:phase|stage|step)\s+)?\d+[.:]\s*', re.IGNORECASE)
+STEP_RE = re.compile(r'^\s*(?:(\d+)\.|([-*]))?\s*\*\*([a-z0-9][a-z0-9-]*)\*\*[^:]*:\s*(.*)$')
+# Placeholders of a run --exec command; any other braces (find -exec {}, awk) are left alone
+PLACEHOLDER_RE = re.compile(r'\{(agent|task|step|stage)\}')
+
+
+def workflow_dir():
+    """Directory holding the workflow definitions"""
+    installed = Path.home() / ".claude" / "workflow"
+    if installed.is_dir():
+        return installed
+    return Path(__file__).resolve().parent.parent / "workflow"
+
+
+def get_cache_path():
+    """Location of the compiled workflow cache"""
+    return Path.home() / ".claude" / "data" / "workflow-dags.json"
+
+
+def slugify(text):
+    """Lowercase, dash-separated form of a heading"""
+    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')
+
+
+def parse_blocks(text):
+    """Split a workflow file into [(section, heading, [(kind, agent, task)])]
+
+    kind is "seq" for numbered items and "par" for bullets and bare paragraphs.
+    """
+    blocks = []
+    section = heading = None
+    in_code = False
+    for line in text.splitlines():
+        if line.lstrip().startswith('```'):
+            in_code = not in_code
+            continue
+        if in_code:
+            continue
+        match = SECTION_RE.match(line)
+        if match and not line.startswith('###'):
+            section, heading = match.group(1), None
+            continue
+        match = HEADING_RE.match(line)
+        if match:
+            heading = match.group(1)
+            blocks.append((section, heading, []))
+            continue
+        match = STEP_RE.match(line)
+        if match and blocks and blocks[-1][1] == heading:
+            kind = "seq" if match.group(1) else "par"
+            blocks[-1][2].append((kind, match.group(3), match.group(4).strip()))
+    return [block for block in blocks if block[2]]
+
+
+def add_block(pipeline, steps, after):
+    """Append one heading's steps to a pipeline; returns the IDs of all added steps
+
+    Every step depends on `after`; numbered steps additionally depend on the
+    previous numbered step of the heading.
+    """
+    added = []
+    previous_seq = None
+    for kind, agent, task in steps:
+        step_id = f"s{len(pipeline['steps']) + 1}"
+        deps = list(after)
+        if kind == "seq" and previous_seq:
+            deps.append(previous_seq)
+        pipeline['steps'].append({"id": step_id, "agent": agent, "task": task,
+                                  "stage": pipeline['_stage'], "deps": deps})
+        if kind == "seq":
+            previous_seq = step_id
+        added.append(step_id)
+    return added
+
+
+def compile_workflow(text, name):
+    """Compile the text of one workflow file into {"name", "pipelines": {id: pipeline}}"""
+    pipelines = {}
+    staged = {}
+    for section, heading, steps in parse_blocks(text):
+        if NUMBERED_HEADING_RE.match(heading):
+            key = slugify(section or name)
+            pipeline = staged.get(key)
+            if pipeline is None:
+                pipeline = staged[key] = pipelines[key] = {"title": section or name, "steps": [], "_last": []}
+            pipeline['_stage'] = NUMBERED_HEADING_RE.sub('', heading)
+            pipeline['_last'] = add_block(pipeline, steps, pipeline['_last'])
+        else:
+            key = slugify(heading)
+            if key in pipelines:
+                key = f"{slugify(section or name)}-{key}"
+            pipeline = pipelines[key] = {"title": heading, "steps": [], "_stage": heading}
+            add_block(pipeline, steps, [])
+    for pipeline in pipelines.values():
+        pipeline.pop('_stage', None)
+        pipeline.pop('_last', None)
+        pipeline.update(analyze(pipeline['steps']))
+    return {"name": name, "pipelines": pipelines}
+
+
+def analyze(steps, durations=None):
+    """Levels (waves of independent steps) and the critical path of a step list
+
+    durations maps step IDs to weights (default 1 per step). Steps are listed
+    in dependency order, which compile_workflow guarantees.
+    """
+    durations = durations or {}
+    finish = {}
+    via = {}
+    level = {}
+    for step in steps:
+        deps = step['deps']
+        start = max((finish[d] for d in deps), default=0)
+        finish[step['id']] = start + durations.get(step['id'], 1)
+        via[step['id']] = max(deps, key=lambda d: finish[d]) if deps else None
+        level[step['id']] = max((level[d] + 1 for d in deps), default=0)
+
+    levels = []
+    for step in steps:
+        while len(levels) <= level[step['id']]:
+            levels.append([])
+        levels[level[step['id']]].append(step['id'])
+
+    path = []
+    current = max(finish, key=finish.get) if finish else None
+    while current:
+        path.append(current)
+        current = via[current]
+    return {
+        "levels": levels,
+        "critical_path": path[::-1],
+        "critical_path_length": max(finish.values(), default=0),
+        "total_length": sum(durations.get(step['id'], 1) for step in steps)
+    }
+
+
+def load_cache(cache_path):
+    """Load compiled workflows keyed by file hash; {} when missing or stale"""
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    if cache.get('version') != COMPILER_VERSION:
+        return {}
+    return cache.get('workflows', {})
+
+
+def save_cache(cache_path, workflows):
+    """Atomically write the compiled workflow cache"""
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_name(cache_path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': COMPILER_VERSION, 'workflows': workflows}, f, ensure_ascii=False)
+    os.replace(tmp_path, cache_path)
+
+
+def compile_all(directory=None, cache_path=None):
+    """Compile every workflow file, reusing cached DAGs of unchanged files
+
+    Returns ({workflow name: compiled}, recompiled count).
+    """
+    directory = Path(directory) if directory else workflow_dir()
+    cache_path = cache_path or get_cache_path()
+    cached = load_cache(cache_path)
+    workflows = {}
+    fresh = {}
+    recompiled = 0
+    for path in sorted(directory.glob('*.md')):
+        raw = path.read_bytes()
+        digest = hashlib.sha256(raw).hexdigest()
+        compiled = cached.get(digest)
+        if compiled is None or compiled.get('name') != path.stem:
+            compiled = compile_workflow(raw.decode('utf-8'), path.stem)
+            recompiled += 1
+        fresh[digest] = compiled
+        if compiled['pipelines']:
+            workflows[path.stem] = compiled
+    if recompiled or len(fresh) != len(cached):
+        save_cache(cache_path, fresh)
+    return workflows, recompiled
+
+
+def find_pipeline(workflows, ref):
+    """Resolve "workflow/pipeline" (or a workflow with a single pipeline)"""
+    name, _, pipeline_id = ref.partition('/')
+    workflow = workflows.get(name)
+    if workflow is None:
+        raise KeyError(f"Unknown workflow: {name}")
+    pipelines = workflow['pipelines']
+    if not pipeline_id:
+        if len(pipelines) != 1:
+            raise KeyError(f"{name} has several pipelines: {', '.join(pipelines)}")
+        pipeline_id = next(iter(pipelines))
+    if pipeline_id not in pipelines:
+        raise KeyError(f"Unknown pipeline {pipeline_id} in {name}; available: {', '.join(pipelines)}")
+    return pipeline_id, pipelines[pipeline_id]
+
+
+def ready_steps(pipeline, done):
+    """Steps whose dependencies are all done and which are not done themselves"""
+    done = set(done)
+    return [step for step in pipeline['steps']
+            if step['id'] not in done and all(d in done for d in step['deps'])]
+
+
+class LaneRecorder:
+    """Record scheduled steps as ASM lane transitions when a session is active"""
+
+    def __init__(self, cwd):
+        import asm_core
+        self.asm_core = asm_core
+        self.cwd = cwd
+        self.enabled = asm_core.get_session_path(cwd) is not None
+
+    def enter(self, step, ref):
+        if not self.enabled:
+            return None
+        response = self.asm_core.transition_to(step['agent'], f"workflow {ref} {step['id']}: {step['task']}",
+                                               self.cwd, lane="new")
+        return response['result'].get('data', {}).get('lane')
+
+    def leave(self, step, lane, ref, returncode):
+        if lane:
+            self.asm_core.transition_to("MAIN", f"workflow {ref} {step['id']} exited {returncode}", self.cwd, lane=lane)
+
+
+def run_pipeline(pipeline, ref, command, workers=None, cwd=None):
+    """Run every step as soon as its dependencies succeeded, up to `workers` at a time
+
+    command has {agent}, {task}, {step} and {stage} replaced (shell-quoted), in one pass.
+    Steps after a failed step are skipped. Each running step occupies its own
+    ASM lane in the active session.
+    """
+    cwd = cwd or os.getcwd()
+    recorder = LaneRecorder(cwd)
+    steps = {step['id']: step for step in pipeline['steps']}
+    workers = workers or len(steps) or 1
+    results = {}
+    lock = threading.Lock()
+
+    def run_step(step):
+        lane = recorder.enter(step, ref)
+        values = {key: shlex.quote(str(step[key])) for key in ('agent', 'task', 'stage')}
+        values['step'] = step['id']
+        argv = PLACEHOLDER_RE.sub(lambda match: values[match.group(1)], command)
+        start = time.perf_counter()
+        proc = subprocess.run(argv, shell=True, cwd=cwd)
+        seconds = time.perf_counter() - start
+        recorder.leave(step, lane, ref, proc.returncode)
+        with lock:
+            results[step['id']] = {"agent": step['agent'], "lane": lane,
+                                   "returncode": proc.returncode, "seconds": round(seconds, 3)}
+
+    started = time.perf_counter()
+    done = set()
+    running = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            # Failed steps stay out of `done`, so nothing that depends on them becomes ready
+            for step in ready_steps(pipeline, done):
+                if step['id'] not in running and step['id'] not in results:
+                    running[step['id']] = pool.submit(run_step, step)
+            if not running:
+                break
+            finished, _ = wait(running.values(), return_when=FIRST_COMPLETED)
+            for step_id, future in list(running.items()):
+                if future in finished:
+                    future.result()
+                    del running[step_id]
+                    if results[step_id]['returncode'] == 0:
+                        done.add(step_id)
+    wall = time.perf_counter() - started
+
+    timing = analyze(pipeline['steps'], {s: results[s]['seconds'] if s in results else 0 for s in steps})
+    return {
+        "status": "completed" if len(done) == len(steps) else "failed",
+        "pipeline": ref,
+        "steps": results,
+        "skipped": [s for s in steps if s not in results],
+        "wall_seconds": round(wall, 3),
+        "sum_seconds": round(sum(r['seconds'] for r in results.values()), 3),
+        "critical_path": timing['critical_path'],
+        "critical_path_seconds": round(timing['critical_path_length'], 3),
+        "lanes": recorder.enabled
+    }
+
+
+def main():
+    """Command line interface"""
+    from asm_core import output_json
+
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    options = dict(arg[2:].split('=', 1) for arg in sys.argv[1:] if arg.startswith('--') and '=' in arg)
+    if not args or args[0] not in ('list', 'show', 'ready', 'run') or (args[0] != 'list' and len(args) < 2):
+        print(__doc__.strip())
+        sys.exit(1)
+
+    workflows, recompiled = compile_all(options.get('dir'))
+    action = args[0]
+    if action == 'list':
+        output_json({
+            "workflows": {name: {pid: {"steps": len(p['steps']), "critical_path_length": p['critical_path_length']}
+                                 for pid, p in workflow['pipelines'].items()}
+                          for name, workflow in workflows.items()},
+            "recompiled": recompiled
+        })
+        return
+
+    ref = args[1]
+    try:
+        if action == 'show' and '/' not in ref and ref in workflows and len(workflows[ref]['pipelines']) > 1:
+            output_json(workflows[ref])
+            return
+        pipeline_id, pipeline = find_pipeline(workflows, ref)
+    except KeyError as e:
+        output_json({"status": "error", "message": str(e.args[0])})
+        sys.exit(1)
+    ref = f"{ref.partition('/')[0]}/{pipeline_id}"
+
+    if action == 'show':
+        output_json({"pipeline": ref, **pipeline})
+    elif action == 'ready':
+        done = [s for s in options.get('done', '').split(',') if s]
+        output_json({"pipeline": ref, "done": done, "ready": ready_steps(pipeline, done)})
+    else:
+        if 'exec' not in options:
+            output_json({"status": "error", "message": "run needs --exec='<command>'"})
+            sys.exit(1)
+        workers = int(options['workers']) if 'workers' in options else None
+        result = run_pipeline(pipeline, ref, options['exec'], workers)
+        output_json(result)
+        sys.exit(0 if result['status'] == 'completed' else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Agent Parsing Benchmark
+Compares serial PyYAML parsing, the fast frontmatter path and process-pool parsing
+on a synthetic agents directory
+
+Usage:
+    python3 benchmark_agent_parsing.py [--agents=5000] [--workers=N]
+"""
+
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+
+def load_generator():
+    """Import generate-agent-list.py (its file name is not a valid module name)"""
+    spec = importlib.util.spec_from_file_location("generate_agent_list", SCRIPTS_DIR / "generate-agent-list.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def synthetic_agent(i):
+    """Build an agent definition shaped like the real ones: one long escaped description line"""
+    prefix = ("consolidated", "optimized", "juvenile")[i % 3]
+    examples = "".join(
+        f"<example>\\nContext: User needs help with task {i}-{n}\\nuser: Please handle workload {n} for project {i}\\n"
+        f"assistant: I'll use the {prefix}-agent-{i:05d} agent to handle this.\\n<commentary>\\n"
+        f"Task {n} matches this agent's specialty.\\n</commentary>\\n</example>\\n\\n"
+        for n in range(4)
+    )
+    # Every third agent has a YAML-clean description, the rest contain ": " like most real agents
+    lead = f"Use this agent for synthetic workload {i}" if i % 3 == 0 else f"Use this agent when you need workload {i}. Examples:\\n\\n{examples}"
+    return (
+        f"---\nname: {prefix}-agent-{i:05d}\ndescription: {lead}\nmodel: inherit\ncolor: blue\n---\n\n"
+        f"# Role & Mission\nSynthetic agent number {i} used for parser benchmarks.\n\n"
+        + "## Capabilities\n" + "".join(f"- Capability {n} of agent {i}\n" for n in range(40))
+    )
+
+
+def timed(label, fn):
+    """Run fn with its output silenced and return (label, seconds, result)"""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = fn()
+    return label, time.perf_counter() - start, result
+
+
+def main():
+    """Main entry point"""
+    count = 5000
+    workers = os.cpu_count() or 1
+    for arg in sys.argv[1:]:
+        if arg.startswith('--agents='):
+            count = int(arg.split('=', 1)[1])
+        elif arg.startswith('--workers='):
+            workers = int(arg.split('=', 1)[1])
+
+    generator = load_generator()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        agents_dir = Path(tmp) / "agents"
+        agents_dir.mkdir()
+        for i in range(count):
+            (agents_dir / f"agent-{i:05d}.md").write_text(synthetic_agent(i), encoding='utf-8')
+
+        runs = [
+            timed("serial_yaml", lambda: generator.scan_agents_directory(
+                use_cache=False, workers=1, agents_dir=agents_dir, fast=False)),
+            timed("serial_fast", lambda: generator.scan_agents_directory(
+                use_cache=False, workers=1, agents_dir=agents_dir, fast=True)),
+            timed("parallel_fast", lambda: generator.scan_agents_directory(
+                use_cache=False, workers=workers, agents_dir=agents_dir, fast=True)),
+        ]
+
+    baseline = runs[0][1]
+    results = {
+        "agents": count,
+        "workers": workers,
+        "runs": {label: {"seconds": round(seconds, 4), "parsed": len(agents), "speedup": round(baseline / seconds, 2)}
+                 for label, seconds, agents in runs}
+    }
+
+    print(f"📊 Parsed {count} synthetic agents ({workers} workers)")
+    for label, seconds, _ in runs:
+        print(f"  - {label:<14} {seconds:8.3f}s  x{baseline / seconds:.2f}")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
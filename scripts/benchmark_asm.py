@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+ASM Benchmark Suite
+Times every ASM entry point against synthetic sessions and agent catalogs of
+growing size, and compares the results with a previous run
+
+Each entry point is measured three ways:
+    cold    - a fresh `python3 <script>` process, as Claude runs it
+    warm    - in-process through asm_core.run_command with a SessionCache (the daemon path)
+    import  - `python3 -X importtime` cumulative import cost of the script's modules
+
+Usage:
+    python3 benchmark_asm.py [--transitions=1000,10000,100000] [--conversations=10000]
+                             [--outputs=2000] [--agents=10000] [--repeat=5]
+                             [--output=results.json] [--compare=baseline.json] [--threshold=0.25]
+    python3 benchmark_asm.py --full     # 10^3-10^6 transitions
+    python3 benchmark_asm.py --quick    # small sizes for a smoke run
+    python3 benchmark_asm.py --check-imports [--repeat=5]
+                                        # exit 1 when an entry point's imports exceed IMPORT_BUDGETS
+"""
+
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from benchmark_agent_parsing import synthetic_agent
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+RESULTS_VERSION = 1
+
+DEFAULTS = {
+    "transitions": [1000, 10000, 100000],
+    "conversations": 10000,
+    "outputs": 2000,
+    "agents": 10000,
+    "repeat": 5,
+    "threshold": 0.25,
+}
+FULL_TRANSITIONS = [1000, 10000, 100000, 1000000]
+QUICK = {"transitions": [1000], "conversations": 100, "outputs": 100, "agents": 200, "repeat": 3}
+
+# Modules each entry point imports, measured with -X importtime
+IMPORTS = {
+    "asm_core": "import asm_core",
+    "asm_store": "import asm_store",
+    "asm_manifest": "import asm_manifest",
+    "simple_asm_logger": "import simple_asm_logger",
+    "generate_agent_list": "import importlib.util as u; s = u.spec_from_file_location('g', 'generate-agent-list.py'); "
+                           "s.loader.exec_module(u.module_from_spec(s))",
+}
+
+# Cold-start import budget of every entry point script, in milliseconds of
+# cumulative -X importtime beyond what the interpreter imports at startup
+IMPORT_BUDGETS = {
+    "asm_init.py": 40,
+    "asm_start_conversation.py": 40,
+    "asm_transition_to.py": 40,
+    "asm_end_conversation.py": 40,
+    "asm_todo.py": 20,
+    "asm.py": 40,
+    "asm_daemon.py": 60,
+    "simple_asm_logger.py": 40,
+    "generate-agent-list.py": 40,
+    "match-agent.py": 40,
+    "agent-info.py": 40,
+    "agent_catalog.py": 40,
+    "asm_archive.py": 40,
+}
+
+AGENT_NAMES = ["consolidated-fullstack-data-engineer", "juvenile-log-analyzer", "optimized-code-reviewer"]
+IMPORTTIME_RE = re.compile(r'^import time:\s+\d+ \|\s+(\d+) \| (.*)$')
+
+
+def synthetic_session(root, transitions, conversations, outputs):
+    """Write a session under root/.asm/bench shaped like one that has run for a long time
+
+    The state log cycles MAIN -> agent -> MAIN across the conversations, the last
+    conversation is active and holds a nested outputs/ tree of `outputs` files.
+    """
+    from asm_core import AGENT_PERMISSIONS, INIT_PERMISSIONS, MAIN_PERMISSIONS
+
+    parent = Path(root) / '.asm'
+    session_path = parent / 'bench'
+    conv_dir = session_path / 'conversations'
+    conv_dir.mkdir(parents=True)
+    (parent / '.current_asm_session').write_text(str(session_path))
+
+    start = datetime(2025, 9, 1)
+    per_conv = max(1, transitions // conversations)
+    conv_ids = [f"conv_{n:06d}" for n in range(1, conversations + 1)]
+    with open(session_path / 'state.jsonl', 'w', encoding='utf-8') as f:
+        f.write(json.dumps({
+            "timestamp": start.isoformat(), "type": "initialization", "session_path": str(session_path),
+            "session": "system",
+            "data": {"previous_state": "", "state": "BASH", "trigger": "init", "agent_list_file": "",
+                     "agent_description_file": "", "permissions": INIT_PERMISSIONS}
+        }) + "\n")
+        previous = "BASH"
+        for i in range(transitions):
+            conv = conv_dir / conv_ids[min(i // per_conv, conversations - 1)]
+            state = "MAIN" if i % 2 == 0 else AGENT_NAMES[i % len(AGENT_NAMES)]
+            f.write(json.dumps({
+                "timestamp": (start + timedelta(seconds=i)).isoformat(), "type": "transition",
+                "session_path": str(session_path), "session": "dialogue" if state == "MAIN" else "execution",
+                "data": {"previous_state": previous, "state": state, "trigger": f"synthetic step {i}",
+                         "workspace": str(conv / 'outputs'), "dialogue_path": str(conv / 'dialogue.md'),
+                         "permissions": MAIN_PERMISSIONS if state == "MAIN" else AGENT_PERMISSIONS}
+            }) + "\n")
+            previous = state
+
+    with open(conv_dir / 'messages.jsonl', 'w', encoding='utf-8') as f:
+        for n, conv_id in enumerate(conv_ids[:-1]):
+            (conv_dir / conv_id / 'outputs').mkdir(parents=True)
+            (conv_dir / conv_id / 'dialogue.md').write_text(f"# Conversation: {conv_id}\n\n")
+            f.write(json.dumps({
+                "conversation_id": conv_id, "timestamp": (start + timedelta(minutes=n)).isoformat(),
+                "summary": f"Synthetic conversation {n}", "files_created": [],
+                "agents_used": [AGENT_NAMES[n % len(AGENT_NAMES)]]
+            }) + "\n")
+
+    active = conv_dir / conv_ids[-1]
+    for i in range(outputs):
+        path = active / 'outputs' / f"dir_{i % 20:02d}" / f"sub_{i % 7}" / f"file_{i:06d}.txt"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(f"synthetic output {i}\n" * 32)
+    (active / 'dialogue.md').write_text(f"# Conversation: {conv_ids[-1]}\n\n")
+    (conv_dir / '.conv_counter').write_text(f"{conversations}\n")
+    (conv_dir / '.current_conversation').write_text(conv_ids[-1])
+    return session_path
+
+
+def synthetic_agents(home, count):
+    """Write `count` agent definitions into home/.claude/agents"""
+    agents_dir = Path(home) / '.claude' / 'agents'
+    agents_dir.mkdir(parents=True)
+    for i in range(count):
+        (agents_dir / f"agent-{i:05d}.md").write_text(synthetic_agent(i), encoding='utf-8')
+    return agents_dir
+
+
+def summarize(samples):
+    """Collapse repeated timings into the numbers results are compared on"""
+    return {
+        "median": round(statistics.median(samples), 6),
+        "min": round(min(samples), 6),
+        "max": round(max(samples), 6),
+        "runs": len(samples),
+    }
+
+
+def run_cold(argv, cwd, env, repeat):
+    """Time a script as a fresh process, `repeat` times"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *argv], cwd=cwd, env=env, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL, check=False)
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def run_warm(command, args, cwd, cache, repeat):
+    """Time an in-process command against a shared SessionCache, `repeat` times"""
+    import asm_core
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        asm_core.run_command(command, args, cwd, cache)
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def importtime(statement, env):
+    """{top-level module: cumulative microseconds} from one `python3 -X importtime` run"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], cwd=SCRIPTS_DIR,
+                          env=env, capture_output=True, text=True, check=False)
+    modules = {}
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        # Nested imports are indented under the module that pulled them in
+        if match and not match.group(2).startswith(' '):
+            modules[match.group(2)] = int(match.group(1))
+    return modules
+
+
+def import_cost(statement, env, repeat, baseline="pass"):
+    """Cumulative import time of a statement, excluding what the interpreter imports at startup
+    (or what the baseline statement imports)"""
+    startup = set(importtime(baseline, env))
+    samples = []
+    for _ in range(repeat):
+        modules = importtime(statement, env)
+        samples.append(sum(us for name, us in modules.items() if name not in startup) / 1e6)
+    return summarize(samples)
+
+
+def script_import(script):
+    """Statement importing a script without running its __main__ block"""
+    return ("import importlib.util as u; "
+            f"s = u.spec_from_file_location('entry_point', {str(SCRIPTS_DIR / script)!r}); "
+            "s.loader.exec_module(u.module_from_spec(s))")
+
+
+def check_import_budgets(repeat):
+    """Measure the import cost of every entry point; returns [{script, median_ms, budget_ms}] over budget"""
+    # Measure with bytecode caches, as installed scripts run after their first use
+    env = {key: value for key, value in os.environ.items() if key != "PYTHONDONTWRITEBYTECODE"}
+    over = []
+    for script, budget in IMPORT_BUDGETS.items():
+        importtime(script_import(script), env)
+        # The loader's own importlib.util is not the script's cost
+        median_ms = import_cost(script_import(script), env, repeat, "import importlib.util")["median"] * 1000
+        status = "✓" if median_ms <= budget else "✗"
+        print(f"  {status} {script:<28} {median_ms:8.2f} ms  (budget {budget} ms)")
+        if median_ms > budget:
+            over.append({"script": script, "median_ms": round(median_ms, 3), "budget_ms": budget})
+    return over
+
+
+def bench_session(results, transitions, options, env):
+    """Time the session entry points against one synthetic session size"""
+    import asm_core
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"  - session: {transitions} transitions, {options['conversations']} conversations, "
+              f"{options['outputs']} output files", flush=True)
+        synthetic_session(tmp, transitions, options['conversations'], options['outputs'])
+        scripts = {
+            "transition": ["asm_transition_to.py", "MAIN", "benchmark"],
+            "start": ["asm_start_conversation.py"],
+            "end": ["asm_end_conversation.py", "benchmark"],
+        }
+        repeat = options['repeat']
+        tag = f"[transitions={transitions}]"
+        # end runs first so it sees the large outputs/ tree before start moves the session on
+        for name in ("transition", "end", "start"):
+            results[f"cold.{name}{tag}"] = run_cold([str(SCRIPTS_DIR / scripts[name][0]), *scripts[name][1:]],
+                                                    tmp, env, repeat)
+        cache = asm_core.SessionCache()
+        for name in ("transition", "end", "start"):
+            results[f"warm.{name}{tag}"] = run_warm(name, scripts[name][1:], tmp, cache, repeat)
+
+        start = time.perf_counter()
+        subprocess.run([sys.executable, str(SCRIPTS_DIR / "asm.py"), "compact"], cwd=tmp, env=env,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+        results[f"cold.compact{tag}"] = summarize([time.perf_counter() - start])
+        results[f"cold.transition_compacted{tag}"] = run_cold(
+            [str(SCRIPTS_DIR / "asm_transition_to.py"), "MAIN", "benchmark"], tmp, env, repeat)
+
+
+def bench_catalog(results, options, env):
+    """Time the agent catalog generator and matcher against a synthetic agents directory"""
+    with tempfile.TemporaryDirectory() as home:
+        count = options['agents']
+        print(f"  - catalog: {count} agents", flush=True)
+        synthetic_agents(home, count)
+        catalog_env = dict(env, HOME=home)
+        out_dir = Path(home) / 'catalog'
+        out_dir.mkdir()
+        generator = [str(SCRIPTS_DIR / "generate-agent-list.py"), str(out_dir)]
+        tag = f"[agents={count}]"
+        # First run parses everything; later runs hit the catalog cache
+        results[f"cold.generate_uncached{tag}"] = run_cold(generator, home, catalog_env, 1)
+        results[f"cold.generate_cached{tag}"] = run_cold(generator, home, catalog_env, options['repeat'])
+        results[f"cold.match{tag}"] = run_cold(
+            [str(SCRIPTS_DIR / "match-agent.py"), "please handle workload 3 for project 42", f"--dir={out_dir}"],
+            home, catalog_env, options['repeat'])
+
+
+def run_benchmarks(options):
+    """Run the whole suite and return the results document"""
+    # Keep the scripts away from a running daemon and from the real ~/.claude
+    env = dict(os.environ, ASM_DAEMON_SOCKET=str(Path(tempfile.gettempdir()) / f"asm-bench-{os.getpid()}.sock"))
+    with tempfile.TemporaryDirectory() as home:
+        env["HOME"] = home
+        results = {}
+        print("📊 ASM benchmark", flush=True)
+        results["cold.interpreter"] = run_cold(["-c", "pass"], home, env, options['repeat'])
+        results["cold.todo"] = run_cold([str(SCRIPTS_DIR / "asm_todo.py"), "start"], home, env, options['repeat'])
+        for name, statement in IMPORTS.items():
+            results[f"import.{name}"] = import_cost(statement, env, options['repeat'])
+        for transitions in options['transitions']:
+            bench_session(results, transitions, options, env)
+        bench_catalog(results, options, env)
+
+    return {
+        "version": RESULTS_VERSION,
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "options": options,
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """Compare medians with a baseline run; returns the benchmarks that got slower than threshold"""
+    regressions = []
+    for name, stats in current["results"].items():
+        old = baseline.get("results", {}).get(name)
+        if not old or not old["median"]:
+            continue
+        change = stats["median"] / old["median"] - 1
+        stats["baseline_median"] = old["median"]
+        stats["change"] = round(change, 4)
+        if change > threshold:
+            regressions.append({"benchmark": name, "baseline": old["median"], "current": stats["median"],
+                                "change": round(change, 4)})
+    return regressions
+
+
+def parse_options(argv):
+    """Parse --key=value flags over the defaults"""
+    options = dict(DEFAULTS, check_imports=False)
+    output = compare_path = None
+    for arg in argv:
+        key, _, value = arg[2:].partition('=')
+        if arg == '--check-imports':
+            options['check_imports'] = True
+        elif arg == '--full':
+            options['transitions'] = FULL_TRANSITIONS
+        elif arg == '--quick':
+            options.update(QUICK)
+        elif key == 'transitions':
+            options['transitions'] = [int(v) for v in value.split(',') if v]
+        elif key in ('conversations', 'outputs', 'agents', 'repeat'):
+            options[key] = int(value)
+        elif key == 'threshold':
+            options['threshold'] = float(value)
+        elif key == 'output':
+            output = value
+        elif key == 'compare':
+            compare_path = value
+        else:
+            print(f"Unknown option: {arg}")
+            print(__doc__.strip())
+            sys.exit(1)
+    return options, output, compare_path
+
+
+def main():
+    """Main entry point"""
+    options, output, compare_path = parse_options(sys.argv[1:])
+    if options.pop('check_imports'):
+        print("📦 Entry point import budgets", flush=True)
+        over = check_import_budgets(options['repeat'])
+        if over:
+            print(f"⚠️  {len(over)} entry point(s) over their import budget")
+            sys.exit(1)
+        return
+
+    document = run_benchmarks(options)
+
+    regressions = []
+    if compare_path:
+        with open(compare_path, 'r', encoding='utf-8') as f:
+            regressions = compare(document, json.load(f), options['threshold'])
+        document["regressions"] = regressions
+
+    for name, stats in document["results"].items():
+        change = f"  {stats['change']:+.1%}" if "change" in stats else ""
+        print(f"  {name:<48} {stats['median'] * 1000:10.2f} ms{change}")
+
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(document, f, indent=2)
+        print(f"💾 Results written to {output}")
+
+    if regressions:
+        print(f"⚠️  {len(regressions)} benchmark(s) slower than baseline by more than {options['threshold']:.0%}:")
+        for item in regressions:
+            print(f"  - {item['benchmark']}: {item['baseline'] * 1000:.2f} ms -> {item['current'] * 1000:.2f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
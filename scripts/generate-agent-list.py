@@ -2,18 +2,100 @@
 """
 Agent List Generator
 Automatically extracts and generates agent list from ~/.claude/agents/ directory
+
+asm_init.py calls install_catalog(), which builds a shared, versioned catalog under
+~/.claude/data/catalogs/ only when the agents directory changed and hard-links it
+into the new session.
+
+With --watch it keeps running and republishes the catalog whenever agent files
+are added, edited or deleted (inotify on Linux, mtime polling elsewhere).
 """
 
+import hashlib
+import json
+import os
 import re
-import yaml
+import struct
 import sys
+import time
 from datetime import datetime
 from pathlib import Path
 
-def extract_agent_info_from_md(file_path):
-    """Extract agent information from a markdown file"""
-    with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
+import agent_catalog
+import agent_index
+import asm_trace
+from asm_store import write_atomic
+from asm_trace import span
+
+# Bump when the shape of extracted agent info changes so stale caches are discarded
+CACHE_VERSION = 2
+
+# Below this many files a process pool costs more than it saves
+PARALLEL_MIN_FILES = 64
+
+# Default size of AGENT_DIRECTORY.md, which MAIN reads to pick a delegate
+TOKEN_BUDGET = int(os.environ.get('ASM_CATALOG_TOKENS', 4000))
+MIN_SUMMARY_WIDTH = 24
+PREAMBLE_RE = re.compile(r'^Use this agent (?:when|for|to)\s+(?:you (?:need|want)\s+(?:to\s+)?)?', re.IGNORECASE)
+EXAMPLES_TAIL_RE = re.compile(r'\s*Examples?:?\s*$')
+SENTENCE_RE = re.compile(r'(.+?[.!?。！？])(?:\s|$)')
+
+# Files to exclude (generated files, not actual agents)
+EXCLUDE_FILES = {'AGENT_DIRECTORY.md', 'agent-catalog.json', 'agent-list.txt'}
+
+# Generated files of a catalog. Versions live in ~/.claude/data/catalogs/<id>/, where
+# <id> fingerprints the agents directory, and sessions hard-link the current one
+CATALOG_FILES = ("AGENT_DIRECTORY.md", "agent-list.txt", agent_index.INDEX_FILE, agent_index.DETAILS_FILE,
+                 agent_catalog.CATALOG_FILE, agent_catalog.CATALOG_INDEX)
+# Written last, so a catalog directory holding it is complete
+CATALOG_META = "catalog.json"
+# Older catalog versions kept; sessions linked to a pruned one keep their files
+CATALOG_KEEP = 5
+
+# --watch: seconds without further changes before rebuilding, and the polling period without inotify
+WATCH_DEBOUNCE = 0.5
+WATCH_POLL_INTERVAL = 1.0
+# inotify_event header (wd, mask, cookie, len) and the events that can change an agent file
+INOTIFY_EVENT = struct.Struct('iIII')
+IN_ATTRIB, IN_CLOSE_WRITE, IN_MOVED_FROM, IN_MOVED_TO, IN_DELETE = 0x4, 0x8, 0x40, 0x80, 0x200
+IN_Q_OVERFLOW = 0x4000
+INOTIFY_MASK = IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+
+# Frontmatter lines of the form `key: value` with everything on one line
+FLAT_LINE_RE = re.compile(r'^([A-Za-z_][\w-]*):(?:[ \t]+(.*))?$')
+# Values YAML would not read back as a plain string
+YAML_SPECIAL_RE = re.compile(r'^(?:[\'"\[\]{}>|*&!%@`#,?]|- |-$)|^(?:~|null|true|false|yes|no|on|off|[-+]?[\d.]+(?:[eE][-+]?\d+)?)$', re.IGNORECASE)
+
+
+def parse_flat_frontmatter(text):
+    """Parse frontmatter made only of single-line `key: value` pairs
+
+    Returns None when anything needs a real YAML parser (indentation, quoting,
+    block scalars, typed scalars); duplicate keys are also left to YAML.
+    """
+    metadata = {}
+    for line in text.split('\n'):
+        if not line.strip():
+            continue
+        match = FLAT_LINE_RE.match(line)
+        if not match:
+            return None
+        key, value = match.group(1), (match.group(2) or '').strip()
+        if not value or key in metadata or YAML_SPECIAL_RE.match(value) or ' #' in value:
+            return None
+        metadata[key] = value
+    return metadata
+
+
+def extract_agent_info_from_md(file_path, content=None, fast=True):
+    """Extract agent information from a markdown file
+
+    With fast, flat frontmatter is read by parse_flat_frontmatter and PyYAML is
+    only used when that extractor gives up.
+    """
+    if content is None:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
     
     agent_name = file_path.stem  # Get filename without extension
     
@@ -22,7 +104,13 @@ def extract_agent_info_from_md(file_path):
     metadata = {}
     description = ""
     
-    if yaml_match:
+    flat = parse_flat_frontmatter(yaml_match.group(1)) if yaml_match and fast else None
+    if flat is not None:
+        metadata = flat
+        description = flat.get('description', '')
+    elif yaml_match:
+        # PyYAML costs ~30 ms to import; only frontmatter the flat extractor rejects pays it
+        import yaml
         try:
             # Try to parse YAML
             yaml_content = yaml_match.group(1)
@@ -34,6 +122,7 @@ def extract_agent_info_from_md(file_path):
                 # Keep the full description, don't truncate it
         except yaml.YAMLError:
             # If YAML parsing fails, try to extract description manually
+            # (unquoted ": " inside the one-line descriptions is the usual cause)
             metadata = {}
             # Look for description: line in the frontmatter
             desc_match = re.search(r'^description:\s*(.+?)(?=\n[a-z]+:|$)', yaml_match.group(1), re.MULTILINE | re.DOTALL)
@@ -62,11 +151,70 @@ def extract_agent_info_from_md(file_path):
     }
 
 
-def scan_agents_directory():
-    """Scan the agents directory for all agent definitions"""
-    # Use dynamic path based on user's home directory
-    home_dir = Path.home()
-    agents_dir = home_dir / ".claude" / "agents"
+def get_cache_path():
+    """Location of the persistent agent catalog cache"""
+    return Path.home() / ".claude" / "data" / "agent-catalog-cache.json"
+
+
+def load_catalog_cache(cache_path):
+    """Load cached agent info keyed by file name; returns {} when missing or stale"""
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    if cache.get('version') != CACHE_VERSION:
+        return {}
+    return cache.get('files', {})
+
+
+def save_catalog_cache(cache_path, files):
+    """Atomically write the agent catalog cache"""
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_name(cache_path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        # default=str keeps YAML dates and other non-JSON scalars serializable
+        json.dump({'version': CACHE_VERSION, 'files': files}, f, ensure_ascii=False, default=str)
+    os.replace(tmp_path, cache_path)
+
+
+def load_agent_file(file_path, known_digest=None, fast=True):
+    """Read, hash and parse one agent file; runs in pool workers
+
+    Returns (digest, agent_info, error). agent_info is None when the digest equals
+    known_digest, meaning the cached parse is still valid.
+    """
+    try:
+        raw = file_path.read_bytes()
+        digest = hashlib.sha256(raw).hexdigest()
+        if digest == known_digest:
+            return digest, None, None
+        return digest, extract_agent_info_from_md(file_path, raw.decode('utf-8'), fast), None
+    except Exception as e:
+        return None, None, str(e)
+
+
+def _load_agent_file_job(job):
+    """Unpack a (file_path, known_digest, fast) job for ProcessPoolExecutor.map"""
+    return load_agent_file(*job)
+
+
+def scan_agents_directory(use_cache=True, workers=None, agents_dir=None, fast=True, changed=None):
+    """Scan the agents directory for all agent definitions
+
+    With use_cache, files whose mtime and size match the cache are reused without
+    being read; files that changed on disk are hashed and only reparsed when their
+    content actually differs. Files that do need reading are fanned out over a
+    process pool of `workers` processes (default: CPU count, 1 = serial).
+
+    changed (used by --watch) names the only files that may differ from the
+    cache: every other cached agent is reused without listing the directory or
+    stat-ing its file, and changed names that no longer exist are dropped.
+    """
+    if agents_dir is None:
+        # Use dynamic path based on user's home directory
+        home_dir = Path.home()
+        agents_dir = home_dir / ".claude" / "agents"
 
     print(f"🔍 Scanning {agents_dir} directory...")
 
@@ -75,81 +223,176 @@ def scan_agents_directory():
         return []
     
     agents = []
+    cache_path = get_cache_path()
+    cached_files = load_catalog_cache(cache_path) if use_cache else {}
+    files = {}
+    pending = []
+    reused = 0
     
-    # Files to exclude (generated files, not actual agents)
-    exclude_files = {'AGENT_DIRECTORY.md', 'agent-catalog.json', 'agent-list.txt'}
-    
+    if changed is not None and cached_files:
+        candidates = [agents_dir / name for name in sorted(set(cached_files) | changed) if is_agent_file(name)]
+    else:
+        changed = None
+        candidates = agents_dir.glob("*.md")
+
     # Scan for .md files
-    for file_path in agents_dir.glob("*.md"):
+    for file_path in candidates:
         # Skip excluded files
-        if file_path.name in exclude_files:
+        if file_path.name in EXCLUDE_FILES:
+            continue
+        if changed is not None and file_path.name not in changed:
+            # Untouched since the cache was written
+            files[file_path.name] = cached_files[file_path.name]
+            agents.append(cached_files[file_path.name]['agent'])
+            reused += 1
             continue
             
         try:
-            agent_info = extract_agent_info_from_md(file_path)
-            agents.append(agent_info)
-            print(f"  ✓ Processed: {file_path.name}")
-        except Exception as e:
+            st = file_path.stat()
+        except FileNotFoundError:
+            if changed is None:
+                print(f"  ✗ Error processing {file_path.name}: file disappeared")
+            continue
+        except OSError as e:
             print(f"  ✗ Error processing {file_path.name}: {e}")
+            continue
+        cached = cached_files.get(file_path.name)
+        if cached and cached['mtime_ns'] == st.st_mtime_ns and cached['size'] == st.st_size:
+            # Stat-only hit: nothing to read
+            files[file_path.name] = cached
+            agents.append(cached['agent'])
+            reused += 1
+            continue
+        pending.append((file_path, st, cached))
+    
+    jobs = [(file_path, cached['sha256'] if cached else None, fast) for file_path, _, cached in pending]
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(jobs) >= PARALLEL_MIN_FILES:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_load_agent_file_job, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+    else:
+        results = [load_agent_file(*job) for job in jobs]
+    
+    for (file_path, st, cached), (digest, agent_info, error) in zip(pending, results):
+        if error:
+            print(f"  ✗ Error processing {file_path.name}: {error}")
+            continue
+        if agent_info is None:
+            # Touched but unchanged: keep the parsed info, refresh the stat key
+            agent_info = cached['agent']
+            reused += 1
+        else:
+            print(f"  ✓ Processed: {file_path.name}")
+        files[file_path.name] = {
+            'mtime_ns': st.st_mtime_ns,
+            'size': st.st_size,
+            'sha256': digest,
+            'agent': agent_info
+        }
+        agents.append(agent_info)
+    
+    if use_cache:
+        removed = len(set(cached_files) - set(files))
+        print(f"  ♻️  Reused {reused} cached, reparsed {len(files) - reused}, removed {removed}")
+        if files != cached_files:
+            try:
+                save_catalog_cache(cache_path, files)
+            except OSError as e:
+                print(f"  ⚠️  Could not write catalog cache: {e}")
     
     return agents
 
-def generate_markdown_summary(agents):
-    """Generate markdown formatted agent summary with full descriptions"""
-    content = []
-    content.append("# Available Agents Directory")
-    content.append(f"\n*Auto-generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*")
-    content.append(f"\n**Total Agents: {len(agents)}**")
-    
-    # Statistics
+def estimate_tokens(text):
+    """Rough prompt token count: ~4 characters per token, one per CJK character"""
+    cjk = len(agent_index.CJK_RE.findall(text))
+    return -(-(len(text) - cjk) // 4) + cjk
+
+
+def summarize_description(description):
+    """First sentence of a description without its examples or the "Use this agent when" preamble"""
+    # Descriptions store newlines as literal "\n" sequences
+    text = agent_index.EXAMPLE_RE.sub(' ', description.replace('\\n', '\n'))
+    text = EXAMPLES_TAIL_RE.sub('', ' '.join(text.split()))
+    text = PREAMBLE_RE.sub('', text)
+    match = SENTENCE_RE.match(text)
+    if match:
+        text = match.group(1)
+    return text[:1].upper() + text[1:]
+
+
+def truncate(text, width):
+    """Cut text to width characters at a word boundary"""
+    if len(text) <= width:
+        return text
+    cut = text[:width].rsplit(' ', 1)[0] if ' ' in text[:width] else text[:width]
+    return cut.rstrip(' ,;:') + "…"
+
+
+def generate_markdown_summary(agents, token_budget=TOKEN_BUDGET):
+    """Generate the compact agent directory: one summary line per agent within token_budget
+
+    Summaries are shortened evenly until the whole file fits; full descriptions
+    stay in agent-details.jsonl for agent-info.py.
+    """
     consolidated_count = sum(1 for a in agents if a['consolidated'])
     optimized_count = sum(1 for a in agents if a['optimized'])
-    content.append(f"\n- Consolidated: {consolidated_count}")
-    content.append(f"- Optimized: {optimized_count}")
-    content.append(f"- Standard: {len(agents) - consolidated_count - optimized_count}")
-    
-    content.append("\n## All Agents\n")
-    
-    # List all agents alphabetically
+    header = '\n'.join([
+        "# Available Agents Directory",
+        f"\n*Auto-generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*",
+        f"\n**Total Agents: {len(agents)}** (Consolidated: {consolidated_count}, Optimized: {optimized_count}, "
+        f"Standard: {len(agents) - consolidated_count - optimized_count})",
+        "\nOne line per agent (🔧 consolidated, ⚡ optimized). Shortlist candidates here, then read their full "
+        "descriptions and examples with `python3 ~/.claude/scripts/agent-info.py <name> [<name>...]`.",
+        "\n## All Agents\n",
+    ])
+
+    entries = []
     for agent in sorted(agents, key=lambda x: x['name']):
-        # Determine type badge
-        badges = []
-        if agent['consolidated']:
-            badges.append("🔧 Consolidated")
-        if agent['optimized']:
-            badges.append("⚡ Optimized")
-        badge_str = f" *({', '.join(badges)})*" if badges else ""
-        
-        content.append(f"### `{agent['name']}`{badge_str}")
-        content.append("")
-        
-        # Add full description (already includes examples)
-        content.append(agent['description'])
-        content.append("")
-        content.append("---")
-        content.append("")
-    
-    return '\n'.join(content)
+        badges = ("🔧" if agent['consolidated'] else "") + ("⚡" if agent['optimized'] else "")
+        entries.append((f"- `{agent['name']}`{' ' + badges if badges else ''}", summarize_description(agent['description'])))
+
+    def render(width):
+        return [prefix + (" — " + truncate(summary, width) if summary and width else "") for prefix, summary in entries]
+
+    # Widest summary width whose lines fit the budget (names alone when nothing else does)
+    available = token_budget - estimate_tokens(header)
+    low, high = 0, max((len(summary) for _, summary in entries), default=0)
+    while low < high:
+        width = (low + high + 1) // 2
+        if sum(estimate_tokens(line) + 1 for line in render(width)) <= available:
+            low = width
+        else:
+            high = width - 1
+    # Below a few words a summary says nothing
+    width = low if low >= MIN_SUMMARY_WIDTH else 0
+    return header + '\n' + '\n'.join(render(width)) + '\n'
 
 
 def generate_simple_list(agents):
     """Generate simple text list of agent names"""
     return '\n'.join(sorted([agent['name'] for agent in agents]))
 
-def main():
-    """Main function to generate agent lists"""
+def generate(output_dir=None, use_cache=True, workers=None, token_budget=TOKEN_BUDGET, changed=None):
+    """Scan the agents directory and write AGENT_DIRECTORY.md, agent-list.txt, the match index
+    and the details store
+
+    output_dir defaults to ~/.claude/data; asm_init.py passes the session directory
+    and calls this in-process; --watch passes the changed file names through to
+    scan_agents_directory(). Returns the agents found.
+    """
     # This print will be handled by scan_agents_directory function
-    agents = scan_agents_directory()
+    with span("scan"):
+        agents = scan_agents_directory(use_cache=use_cache, workers=workers, changed=changed)
     
     if not agents:
         print("❌ No agents found")
-        return
+        return agents
     
     print(f"\n✅ Found {len(agents)} agents")
     
-    # Determine output directory from command line argument or use default
-    if len(sys.argv) > 1:
-        output_dir = Path(sys.argv[1])
+    if output_dir is not None:
+        output_dir = Path(output_dir)
     else:
         # Use dynamic path based on user's home directory
         home_dir = Path.home()
@@ -160,19 +403,35 @@ def main():
     print(f"📁 Output directory: {output_dir}")
     
     # Generate markdown summary with full descriptions
-    markdown_content = generate_markdown_summary(agents)
     markdown_path = output_dir / "AGENT_DIRECTORY.md"
-    with open(markdown_path, 'w', encoding='utf-8') as f:
-        f.write(markdown_content)
-    print(f"📄 Generated markdown directory: {markdown_path}")
+    # Replaced rather than rewritten: the file may be hard-linked from a shared catalog
+    with span("markdown"):
+        summary = generate_markdown_summary(agents, token_budget)
+        write_atomic(markdown_path, summary)
+    print(f"📄 Generated markdown directory: {markdown_path} (~{estimate_tokens(summary)} of {token_budget} tokens)")
+
+    # Full descriptions, looked up per agent by agent-info.py
+    with span("details"):
+        agent_index.save_details(output_dir, agents)
+    print(f"📚 Generated agent details: {output_dir / agent_index.DETAILS_FILE}")
+
+    # Structured catalog for agent_catalog.py queries
+    with span("catalog"):
+        agent_catalog.save_catalog(output_dir, [agent_catalog.catalog_record(agent, summarize_description(agent['description']))
+                                                for agent in agents])
+    print(f"🗂️  Generated agent catalog: {output_dir / agent_catalog.CATALOG_FILE}")
     
     # Generate simple list
-    list_content = generate_simple_list(agents)
     list_path = output_dir / "agent-list.txt"
-    with open(list_path, 'w', encoding='utf-8') as f:
-        f.write(list_content)
+    with span("agent_list"):
+        write_atomic(list_path, generate_simple_list(agents))
     print(f"📝 Generated simple list: {list_path}")
     
+    # Update the BM25 index used by match-agent.py
+    with span("index"):
+        index, rebuilt = agent_index.update_index(output_dir, agents)
+    print(f"🔎 Updated match index: {agent_index.index_path(output_dir)} ({rebuilt} of {index['doc_count']} agents reindexed)")
+    
     # Print summary
     print("\n📈 Summary:")
     consolidated = sum(1 for a in agents if a['consolidated'])
@@ -183,6 +442,290 @@ def main():
     print(f"  - Consolidated: {consolidated} agents")
     print(f"  - Optimized: {optimized} agents")
     print(f"  - Standard: {standard} agents")
+    return agents
+
+
+def get_catalogs_dir():
+    """Directory holding the shared, versioned agent catalogs"""
+    return Path.home() / ".claude" / "data" / "catalogs"
+
+
+def agents_fingerprint(agents_dir, token_budget=TOKEN_BUDGET):
+    """Catalog ID of an agents directory, from the names, sizes and mtimes of its agent files"""
+    digest = hashlib.sha256(f"{CACHE_VERSION}:{agent_index.INDEX_VERSION}:{agent_index.DETAILS_VERSION}:"
+                            f"{agent_catalog.CATALOG_VERSION}:{token_budget}".encode())
+    with os.scandir(agents_dir) as entries:
+        files = sorted((entry.name, entry.stat()) for entry in entries
+                       if entry.name.endswith('.md') and entry.name not in EXCLUDE_FILES and entry.is_file())
+    for name, st in files:
+        digest.update(f"{name}\0{st.st_size}\0{st.st_mtime_ns}\n".encode())
+    return digest.hexdigest()[:16]
+
+
+def list_catalogs(catalogs_dir):
+    """Complete catalog directories, newest first"""
+    try:
+        entries = [Path(entry.path) for entry in os.scandir(catalogs_dir)
+                   if not entry.name.startswith('.') and entry.is_dir()]
+    except FileNotFoundError:
+        return []
+    stamped = []
+    for catalog_dir in entries:
+        try:
+            stamped.append(((catalog_dir / CATALOG_META).stat().st_mtime_ns, catalog_dir))
+        except FileNotFoundError:
+            continue
+    return [catalog_dir for _, catalog_dir in sorted(stamped, reverse=True)]
+
+
+def ensure_catalog(use_cache=True, workers=None, token_budget=TOKEN_BUDGET, changed=None):
+    """Return (catalog_id, catalog_dir) of the catalog matching the agents directory
+
+    The catalog is built only when no session has built this version yet; it is
+    generated into a temporary directory and renamed into place, so concurrent
+    inits never see a partial catalog. Returns (None, None) when there are no agents.
+    """
+    import shutil
+    import tempfile
+
+    agents_dir = Path.home() / ".claude" / "agents"
+    if not agents_dir.exists():
+        print(f"Error: Agents directory not found at {agents_dir}")
+        return None, None
+    catalog_id = agents_fingerprint(agents_dir, token_budget)
+    catalogs_dir = get_catalogs_dir()
+    catalog_dir = catalogs_dir / catalog_id
+    if (catalog_dir / CATALOG_META).exists():
+        print(f"♻️  Reusing agent catalog {catalog_id}")
+        return catalog_id, catalog_dir
+
+    catalogs_dir.mkdir(parents=True, exist_ok=True)
+    previous = list_catalogs(catalogs_dir)
+    build_dir = Path(tempfile.mkdtemp(prefix=f".{catalog_id}.", dir=catalogs_dir))
+    try:
+        if previous:
+            # Start from the last index so only changed agents are reindexed
+            shutil.copy2(agent_index.index_path(previous[0]), build_dir)
+        agents = generate(build_dir, use_cache=use_cache, workers=workers, token_budget=token_budget, changed=changed)
+        if not agents:
+            return None, None
+        write_atomic(build_dir / CATALOG_META, json.dumps({
+            "id": catalog_id,
+            "created": datetime.now().isoformat(),
+            "agents": len(agents),
+            "files": list(CATALOG_FILES)
+        }, ensure_ascii=False, indent=2))
+        try:
+            os.rename(build_dir, catalog_dir)
+        except OSError:
+            # Another init published this version first
+            if not (catalog_dir / CATALOG_META).exists():
+                raise
+    finally:
+        shutil.rmtree(build_dir, ignore_errors=True)
+    print(f"📦 Published agent catalog {catalog_id}: {catalog_dir}")
+
+    for stale in list_catalogs(catalogs_dir)[CATALOG_KEEP + 1:]:
+        shutil.rmtree(stale, ignore_errors=True)
+    return catalog_id, catalog_dir
+
+
+def link_catalog(catalog_dir, output_dir):
+    """Hard-link the files of a catalog into output_dir, copying across filesystems"""
+    import shutil
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for name in CATALOG_FILES:
+        # Linked beside the old file and renamed over it, so readers never find it missing
+        tmp_path = output_dir / f".{name}.{os.getpid()}.tmp"
+        tmp_path.unlink(missing_ok=True)
+        try:
+            os.link(catalog_dir / name, tmp_path)
+        except OSError:
+            shutil.copy2(catalog_dir / name, tmp_path)
+        os.replace(tmp_path, output_dir / name)
+
+
+def install_catalog(output_dir, use_cache=True, workers=None, token_budget=TOKEN_BUDGET, changed=None):
+    """Link the current shared catalog into a session directory; returns its ID (None without agents)"""
+    catalog_id, catalog_dir = ensure_catalog(use_cache=use_cache, workers=workers, token_budget=token_budget,
+                                             changed=changed)
+    if catalog_dir is not None:
+        with span("link"):
+            link_catalog(catalog_dir, output_dir)
+        print(f"🔗 Linked agent catalog {catalog_id} into {output_dir}")
+    return catalog_id
+
+
+def is_agent_file(name):
+    """Whether a file name in the agents directory is an agent definition"""
+    return name.endswith('.md') and name not in EXCLUDE_FILES
+
+
+class AgentsWatcher:
+    """Report added, edited and deleted agent files of a directory
+
+    Uses inotify (through libc, no extra package) where the platform has it and
+    falls back to comparing the names, sizes and mtimes of the agent files.
+    """
+
+    def __init__(self, agents_dir, interval=WATCH_POLL_INTERVAL):
+        self.agents_dir = Path(agents_dir)
+        self.interval = interval
+        self.fd = self.open_inotify()
+        self.method = "inotify" if self.fd is not None else "polling"
+        self.snapshot = self.scan() if self.fd is None else None
+
+    def open_inotify(self):
+        """Non-blocking inotify descriptor watching agents_dir, or None"""
+        try:
+            import ctypes
+            libc = ctypes.CDLL(None, use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (OSError, AttributeError):
+            return None
+        if fd < 0:
+            return None
+        if libc.inotify_add_watch(fd, os.fsencode(self.agents_dir), INOTIFY_MASK) < 0:
+            os.close(fd)
+            return None
+        return fd
+
+    def scan(self):
+        """{name: (size, mtime_ns)} of the agent files"""
+        try:
+            with os.scandir(self.agents_dir) as entries:
+                return {entry.name: (st.st_size, st.st_mtime_ns)
+                        for entry in entries if is_agent_file(entry.name) and entry.is_file()
+                        for st in (entry.stat(),)}
+        except FileNotFoundError:
+            return {}
+
+    def wait(self, timeout=None):
+        """Names of the agent files changed within timeout seconds (forever when None); empty on timeout"""
+        if self.fd is not None:
+            import select
+            if not select.select([self.fd], [], [], timeout)[0]:
+                return set()
+            return self.read_events()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            delay = self.interval if deadline is None else min(self.interval, max(0.0, deadline - time.monotonic()))
+            time.sleep(delay)
+            snapshot = self.scan()
+            changed = {name for name in snapshot.keys() | self.snapshot.keys()
+                       if snapshot.get(name) != self.snapshot.get(name)}
+            self.snapshot = snapshot
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def read_events(self):
+        """Drain pending inotify events into the names of changed agent files"""
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(data):
+                _, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+                offset += INOTIFY_EVENT.size
+                name = data[offset:offset + length].rstrip(b'\0').decode('utf-8', 'replace')
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    # Events were dropped; rebuild as if everything changed
+                    changed.add('*')
+                elif is_agent_file(name):
+                    changed.add(name)
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+def watch(output_dir=None, use_cache=True, workers=None, token_budget=TOKEN_BUDGET,
+          debounce=WATCH_DEBOUNCE, interval=WATCH_POLL_INTERVAL):
+    """Keep output_dir (default ~/.claude/data) in sync with the agents directory until interrupted
+
+    Rebuilds after the first go through ensure_catalog() with the names of the
+    changed files: only those are stat-ed and reparsed and only their entries
+    are reindexed, while every other agent comes from the parse cache. The
+    catalog files themselves are small and written whole from the patched agent
+    list, assembled in a temporary directory and swapped into output_dir with a
+    rename per file.
+    """
+    agents_dir = Path.home() / ".claude" / "agents"
+    if not agents_dir.exists():
+        print(f"Error: Agents directory not found at {agents_dir}")
+        return 1
+    session_path = output_dir
+    output_dir = Path(output_dir) if output_dir else Path.home() / ".claude" / "data"
+
+    def rebuild(changed=None):
+        with asm_trace.command("generate", source="watch"):
+            # An explicit output directory is a session, as in main()
+            asm_trace.set_session(session_path)
+            try:
+                install_catalog(output_dir, use_cache=use_cache, workers=workers, token_budget=token_budget,
+                                changed=changed)
+            except OSError as e:
+                print(f"  ⚠️  Could not rebuild the agent catalog: {e}")
+
+    # Watch before the first full build so no edit falls between the two
+    watcher = AgentsWatcher(agents_dir, interval)
+    rebuild()
+    print(f"\n👀 Watching {agents_dir} ({watcher.method}); press Ctrl-C to stop")
+    try:
+        while True:
+            changed = watcher.wait()
+            # Let a burst of saves settle before rebuilding once
+            while True:
+                more = watcher.wait(debounce)
+                if not more:
+                    break
+                changed |= more
+            if not changed:
+                continue
+            print(f"\n✏️  Changed: {', '.join(sorted(changed))}")
+            # An inotify queue overflow lost the names: rescan everything
+            rebuild(None if '*' in changed else changed)
+    except KeyboardInterrupt:
+        print("\n👋 Stopped watching")
+    finally:
+        watcher.close()
+    return 0
+
+
+def main():
+    """Main function to generate agent lists"""
+    # Flags: --no-cache forces a full rescan without reading or writing the cache,
+    # --workers=N sets the parser process count (1 = serial),
+    # --token-budget=N the size of AGENT_DIRECTORY.md (default $ASM_CATALOG_TOKENS or 4000),
+    # --watch keeps the output directory up to date as agent files change
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    flags = [arg for arg in sys.argv[1:] if arg.startswith('--')]
+    use_cache = '--no-cache' not in flags
+    workers = None
+    token_budget = TOKEN_BUDGET
+    for flag in flags:
+        if flag.startswith('--workers='):
+            workers = int(flag.split('=', 1)[1])
+        elif flag.startswith('--token-budget='):
+            token_budget = int(flag.split('=', 1)[1])
+
+    if '--watch' in flags:
+        return watch(args[0] if args else None, use_cache=use_cache, workers=workers, token_budget=token_budget)
+
+    # Determine output directory from command line argument or use default
+    with asm_trace.command("generate"):
+        if args:
+            # Given an output directory, asm_init.py is generating into a session
+            asm_trace.set_session(args[0])
+        generate(args[0] if args else None, use_cache=use_cache, workers=workers, token_budget=token_budget)
+    return 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Agent Matcher
+Ranks agents for a task with the local BM25 index built by generate-agent-list.py,
+escalating to the juvenile-agent-task-matcher agent only when confidence is low
+
+Usage:
+    python3 match-agent.py "<task description>" [--dir=PATH] [--top=N] [--min-score=X] [--min-margin=X]
+"""
+
+import contextlib
+import importlib.util
+import sys
+import time
+from pathlib import Path
+
+import agent_index
+
+LLM_MATCHER = agent_index.LLM_MATCHER
+
+# Confidence thresholds: the best score must clear MIN_SCORE and lead the
+# runner-up by at least MIN_MARGIN (relative)
+MIN_SCORE = 4.0
+MIN_MARGIN = 0.15
+
+
+def build_missing_index(directory):
+    """Build the index from the agent definitions when none has been generated yet"""
+    spec = importlib.util.spec_from_file_location(
+        "generate_agent_list", Path(__file__).resolve().parent / "generate-agent-list.py")
+    generator = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(generator)
+    # Scan progress goes to stderr; stdout carries only the AGENT:/ESCALATE: lines callers parse
+    with contextlib.redirect_stdout(sys.stderr):
+        agents = generator.scan_agents_directory()
+    if not agents:
+        return None
+    directory.mkdir(parents=True, exist_ok=True)
+    index, _ = agent_index.update_index(directory, agents)
+    return index
+
+
+def main():
+    """Main entry point"""
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    options = dict(arg[2:].split('=', 1) for arg in sys.argv[1:] if arg.startswith('--') and '=' in arg)
+
+    if not args:
+        print("Usage: match-agent.py \"<task description>\" [--dir=PATH] [--top=N] [--min-score=X] [--min-margin=X]")
+        sys.exit(1)
+
+    query = " ".join(args)
+    directory = Path(options['dir']) if 'dir' in options else agent_index.default_catalog_dir()
+    top = int(options.get('top', 3))
+    min_score = float(options.get('min-score', MIN_SCORE))
+    min_margin = float(options.get('min-margin', MIN_MARGIN))
+
+    start = time.perf_counter()
+    index = agent_index.load_index(directory) or build_missing_index(directory)
+    if not index:
+        print(f"ESCALATE: {LLM_MATCHER} | Reason: no agent index in {directory}")
+        sys.exit(2)
+
+    ranked = agent_index.search(index, query, limit=max(top, 2))
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    for name, score in ranked[:top]:
+        print(f"AGENT: {name} | score: {score:.2f}")
+
+    if not ranked:
+        print(f"ESCALATE: {LLM_MATCHER} | Reason: no indexed agent shares terms with the request")
+        sys.exit(2)
+
+    best = ranked[0][1]
+    margin = (best - ranked[1][1]) / best if len(ranked) > 1 else 1.0
+    if best < min_score or margin < min_margin:
+        print(f"ESCALATE: {LLM_MATCHER} | Reason: low confidence (score {best:.2f}, margin {margin:.0%})")
+        sys.exit(2)
+
+    print(f"# matched in {elapsed_ms:.1f} ms (score {best:.2f}, margin {margin:.0%})")
+
+
+if __name__ == "__main__":
+    main()
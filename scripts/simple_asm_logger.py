@@ -4,12 +4,32 @@ Simple Agent State Machine Conversation Logger
 
 A lightweight Python script for logging Agent State Machine conversations
 to messages.jsonl format. Supports JSON input to handle spaces and special characters.
+
+Batch mode (--batch) reads newline-delimited JSON from stdin and appends the
+records in group commits, printing one machine-readable summary at the end.
 """
 
 import json
 import sys
+import time
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, IO, Optional
+
+from asm_store import DURABILITY, open_store
+
+# Number of error details kept in the batch summary
+MAX_REPORTED_ERRORS = 20
+
+
+def make_record(conv_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Build a messages.jsonl record from conversation data."""
+    return {
+        "conversation_id": conv_data.get("conversation_id", ""),
+        "timestamp": conv_data.get("timestamp", ""),
+        "summary": conv_data.get("summary", ""),
+        "files_created": conv_data.get("files_created", []),
+        "agents_used": conv_data.get("agents_used", [])
+    }
 
 
 class SimpleASMLogger:
@@ -24,8 +44,12 @@ class SimpleASMLogger:
         # Ensure conversations directory exists
         self.conversations_dir.mkdir(parents=True, exist_ok=True)
 
+        # Records go to the session's store (messages.jsonl or session.db)
+        self.store = open_store(self.session_path)
+        self.location = self.store.db_file if self.store.backend == 'sqlite' else self.messages_file
+
         # Ensure messages.jsonl exists
-        if not self.messages_file.exists():
+        if self.store.backend == 'jsonl' and not self.messages_file.exists():
             self.messages_file.touch()
 
     def log_conversation(self,
@@ -49,27 +73,27 @@ class SimpleASMLogger:
         """
         try:
             # Create conversation record
-            record = {
+            record = make_record({
                 "conversation_id": conversation_id,
                 "timestamp": timestamp,
                 "summary": summary,
                 "files_created": files_created,
                 "agents_used": agents_used
-            }
+            })
 
-            # Append to messages.jsonl
-            with open(self.messages_file, 'a', encoding='utf-8') as f:
-                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            # Append to the conversation index
+            self.store.append_message(record)
 
             print(f"✅ Successfully logged conversation: {conversation_id}")
-            print(f"📁 Location: {self.messages_file}")
+            print(f"📁 Location: {self.location}")
             return True
 
         except Exception as e:
             print(f"❌ Error logging conversation: {e}", file=sys.stderr)
             return False
 
-    def log_from_json(self, json_input: str) -> bool:
+    @staticmethod
+    def log_from_json(json_input: str) -> bool:
         """
         Log conversation from JSON input string.
 
@@ -77,7 +101,7 @@ class SimpleASMLogger:
         {
             "session_path": "/path/to/session",
             "conversation_data": {
-                "conversation_id": "conv_001",
+                "conversation_id": "conv_000001",
                 "timestamp": "2025-09-18T08:10:09",
                 "summary": "Description",
                 "files_created": [{"path": "/file.py", "summary": "File description"}],
@@ -114,9 +138,90 @@ class SimpleASMLogger:
             print(f"❌ Error processing JSON: {e}", file=sys.stderr)
             return False
 
+    @staticmethod
+    def log_stream(stream: IO[str],
+                   session_path: Optional[str] = None,
+                   durability: str = "batch",
+                   batch_size: int = 1000) -> Dict[str, Any]:
+        """
+        Log newline-delimited JSON records in group commits.
+
+        Each line is either the log_from_json envelope or, when session_path is
+        given, a bare conversation_data object. One writer (and file handle) is
+        kept per session for the whole stream.
+
+        Args:
+            stream: Text stream of JSON lines
+            session_path: Default session for bare records
+            durability: "none", "batch" (fsync per group commit) or "record" (fsync per record)
+            batch_size: Records per group commit
+
+        Returns:
+            dict: Summary with record, commit and error counts
+        """
+        start = time.perf_counter()
+        writers = {}
+        failed = 0
+        errors = []
+        try:
+            for line_number, line in enumerate(stream, 1):
+                if not line.strip():
+                    continue
+                try:
+                    data = json.loads(line)
+                    if "conversation_data" in data:
+                        target = data.get("session_path") or session_path
+                        conv_data = data["conversation_data"]
+                    else:
+                        target, conv_data = session_path, data
+                    if not target:
+                        raise ValueError("Missing 'session_path'")
+                    writer = writers.get(target)
+                    if writer is None:
+                        writer = writers[target] = SimpleASMLogger(target).store.message_writer(durability, batch_size)
+                    writer.write(make_record(conv_data))
+                except Exception as e:
+                    failed += 1
+                    if len(errors) < MAX_REPORTED_ERRORS:
+                        errors.append({"line": line_number, "error": str(e)})
+        finally:
+            for writer in writers.values():
+                writer.close()
+
+        return {
+            "status": "ok" if not failed else "partial",
+            "records": sum(writer.records for writer in writers.values()),
+            "failed": failed,
+            "commits": sum(writer.commits for writer in writers.values()),
+            "durability": durability,
+            "sessions": {target: writer.records for target, writer in writers.items()},
+            "seconds": round(time.perf_counter() - start, 3),
+            "errors": errors
+        }
+
 
 def main():
     """Command line interface for the logger."""
+    flags = dict(arg[2:].split('=', 1) if '=' in arg else (arg[2:], '') for arg in sys.argv[1:] if arg.startswith('--'))
+
+    if 'batch' in flags:
+        durability = flags.get('durability') or 'batch'
+        if durability not in DURABILITY:
+            print(json.dumps({"status": "error", "message": f"Unknown durability: {durability}"}))
+            sys.exit(1)
+        batch_size = flags.get('batch-size') or '1000'
+        if not batch_size.isdigit() or int(batch_size) < 1:
+            print(json.dumps({"status": "error", "message": f"Invalid batch size: {batch_size}"}))
+            sys.exit(1)
+        summary = SimpleASMLogger.log_stream(
+            sys.stdin,
+            session_path=flags.get('session') or None,
+            durability=durability,
+            batch_size=int(batch_size)
+        )
+        print(json.dumps(summary, ensure_ascii=False))
+        sys.exit(0 if not summary["failed"] else 1)
+
     # Read JSON from stdin
     try:
         json_input = sys.stdin.read()
@@ -127,12 +232,13 @@ def main():
             print("")
             print("Usage:")
             print(f"    echo '<json>' | python3 {sys.argv[0]}")
+            print(f"    cat records.jsonl | python3 {sys.argv[0]} --batch [--session=PATH] [--durability=none|batch|record] [--batch-size=N]")
             print("")
             print("JSON format:")
             print('''{
     "session_path": "/path/to/session",
     "conversation_data": {
-        "conversation_id": "conv_001",
+        "conversation_id": "conv_000001",
         "timestamp": "2025-09-18T08:10:09",
         "summary": "Task description",
         "files_created": [
@@ -143,8 +249,7 @@ def main():
 }''')
             sys.exit(1)
 
-        logger = SimpleASMLogger("/tmp")  # Temporary, will be overridden by JSON
-        success = logger.log_from_json(json_input)
+        success = SimpleASMLogger.log_from_json(json_input)
         sys.exit(0 if success else 1)
     except Exception as e:
         print(f"❌ Error: {e}", file=sys.stderr)